@@ -11,6 +11,14 @@ orders_db = {}
 order_items_db = {}
 payments_db = {}
 
+# Bumped on every catalog change; drives ETag / Last-Modified on product endpoints
+catalog_meta = {"version": 1, "last_modified": datetime.utcnow()}
+
+def bump_catalog_version():
+    catalog_meta["version"] += 1
+    catalog_meta["last_modified"] = datetime.utcnow()
+    return catalog_meta["version"]
+
 def initialize_products():
     categories = ["Electronics", "Home & Kitchen", "Books", "Clothing", "Sports", "Beauty", "Automotive"]
     adjectives = ["Pro", "Ultra", "Smart", "Mini", "Classic", "Premium", "Elite", "Basic", "Advanced", "Legendary"]
@@ -110,6 +118,8 @@ def initialize_products():
             "image_url": image_url,
             "is_active": True,
             "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+            "revision": 1,
             "rating": round(random.uniform(3.5, 5.0), 1),
             "review_count": random.randint(10, 5000),
         }
@@ -0,0 +1,147 @@
+import json
+import asyncio
+import threading
+from uuid import uuid4
+from collections import deque
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+# -----------------------------
+# Change Feed (In-Process)
+# -----------------------------
+class EventBus:
+    """
+    Append-only log of store mutations that any number of subscribers tail.
+
+    Each event gets a monotonically increasing offset and is encoded once at
+    publish time; subscribers share the encoded frame. Publishing wakes every
+    waiting subscriber with a single asyncio.Event swap, so the cost of a
+    publish does not depend on how far behind a subscriber is. The log keeps
+    the last `history` events so clients can resume from an offset; a client
+    that fell further behind gets a `reset` event and should refetch.
+
+    Offsets restart with the process, so event ids carry a per-process
+    `epoch` ("<epoch>-<offset>"). A client resuming with an id from another
+    epoch, or with an offset this process has not reached, also gets a
+    `reset` and then follows the log from now on.
+    """
+
+    def __init__(self, history: int = 10000):
+        self._log: deque = deque(maxlen=history)
+        self._next_offset = 1
+        self.epoch = uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def last_offset(self) -> int:
+        return self._next_offset - 1
+
+    def format_id(self, offset: int) -> str:
+        return f"{self.epoch}-{offset}"
+
+    def parse_id(self, event_id: str) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Split an event id into (epoch, offset); a bare offset has no epoch.
+        Returns (None, None) if the id is malformed.
+        """
+        epoch, _, offset = event_id.rpartition("-")
+        if not offset.isdigit():
+            return None, None
+        return epoch or None, int(offset)
+
+    def is_stale(self, since: int, epoch: Optional[str] = None) -> bool:
+        """
+        Whether `since` is an offset from before a restart.
+        """
+        return (epoch is not None and epoch != self.epoch) or since > self.last_offset
+
+    def publish(self, topic: str, event_type: str, data: dict) -> int:
+        """
+        Record an event. Safe to call from sync handlers running in the threadpool.
+        """
+        with self._lock:
+            offset = self._next_offset
+            self._next_offset += 1
+            payload = json.dumps({"type": event_type, **data}, separators=(",", ":"), default=str)
+            self._log.append((offset, topic, payload))
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self._notify()
+            else:
+                loop.call_soon_threadsafe(self._notify)
+        return offset
+
+    def _notify(self) -> None:
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        if wakeup is not None:
+            wakeup.set()
+
+    def _since(self, offset: int) -> Tuple[bool, list]:
+        """
+        Events after `offset`, and whether older events were already dropped.
+        """
+        with self._lock:
+            if not self._log:
+                return False, []
+            first = self._log[0][0]
+            if offset + 1 < first:
+                return True, list(self._log)
+            return False, [self._log[i] for i in range(offset + 1 - first, len(self._log))]
+
+    def subscribe(
+        self,
+        since: Optional[int] = None,
+        topics: Optional[Iterable[str]] = None,
+        heartbeat: Optional[float] = None,
+        epoch: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[int, str, str]]:
+        """
+        Yield (offset, topic, payload) for every event after `since` (default:
+        from now on), then keep following the log. `epoch` is the one `since`
+        was issued under, if known. With `heartbeat`, yields (offset, "", "")
+        after that many idle seconds.
+        """
+        # Resolved now rather than on first iteration, so callers see the same log position
+        if since is not None and self.is_stale(since, epoch):
+            return self._follow(self.last_offset, topics, heartbeat, reset_from=since)
+        return self._follow(self.last_offset if since is None else since, topics, heartbeat)
+
+    async def _follow(
+        self,
+        cursor: int,
+        topics: Optional[Iterable[str]],
+        heartbeat: Optional[float],
+        reset_from: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[int, str, str]]:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        topics = set(topics) if topics else None
+
+        if reset_from is not None:
+            # Nothing in this process lines up with the client's offset
+            yield cursor, "", json.dumps({"type": "reset", "from": reset_from})
+
+        while True:
+            wakeup = self._wakeup
+            gap, events = self._since(cursor)
+            if gap:
+                yield cursor, "", json.dumps({"type": "reset", "from": cursor})
+            for offset, topic, payload in events:
+                cursor = offset
+                if topics is None or topic in topics:
+                    yield offset, topic, payload
+            if events:
+                continue
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield cursor, "", ""
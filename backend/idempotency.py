@@ -0,0 +1,94 @@
+import copy
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Tuple
+
+# -----------------------------
+# Idempotency Key Store
+# -----------------------------
+class IdempotencyConflict(Exception):
+    """
+    The key was already used for a different request.
+    """
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "expires_at")
+
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.future: Future = Future()
+        self.expires_at = expires_at
+
+class IdempotencyStore:
+    """
+    Results of mutating requests, keyed by their Idempotency-Key.
+
+    The first request with a key runs; later ones with the same key get a
+    copy of its result without running again. Requests that arrive while the
+    first is still in flight wait for it. Failures are not kept: waiters see
+    the same error, and the next request with the key runs again.
+
+    Entries expire after `ttl` seconds and the oldest are dropped beyond
+    `max_entries`. With blocking=True, waiters block their thread instead of
+    awaiting (for handlers dispatched through the threadpool).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 86400, wait_timeout: float = 30, blocking: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.blocking = blocking
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float) -> None:
+        # Entries are kept in creation order and share one ttl, so expired ones are at the front
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    async def run(self, key: str, fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key. Returns (result, replayed).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                entry = None
+            owner = entry is None
+            if owner:
+                self._entries.pop(key, None)
+                entry = self._entries[key] = _Entry(fingerprint, now + self.ttl)
+            self._evict(now)
+
+        if entry.fingerprint != fingerprint:
+            raise IdempotencyConflict(key)
+
+        if not owner:
+            if self.blocking:
+                result = entry.future.result(timeout=self.wait_timeout)
+            else:
+                # Shielded: cancelling the wrapper would cancel the shared future too
+                result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(entry.future)), self.wait_timeout)
+            return copy.deepcopy(result), True
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            entry.future.set_exception(e)
+            raise
+        # Keep a snapshot: handlers may return live records that change later
+        entry.future.set_result(copy.deepcopy(result))
+        return result, False
@@ -1,13 +1,57 @@
-from fastapi import FastAPI, HTTPException, Query
+import os
+import json
+import asyncio
+import hashlib
+import inspect
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from uuid import UUID, uuid4
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from enum import Enum
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+
+# -----------------------------
+# Handler Dispatch
+# -----------------------------
+# Handlers are `async def` and run on the event loop, offloading only slow work
+# to the threadpool. BACKEND_HANDLERS=threadpool dispatches every handler through
+# the threadpool instead (the old behaviour), for comparison benchmarks.
+ASYNC_HANDLERS = os.getenv("BACKEND_HANDLERS", "async") != "threadpool"
+
+def run_to_completion(endpoint):
+    """
+    Wrap an async handler as a sync function, so FastAPI sends it to the
+    threadpool. Only valid when nothing in the handler suspends, which holds
+    when the store is not offloading.
+    """
+    def call(*args, **kwargs):
+        coro = endpoint(*args, **kwargs)
+        try:
+            coro.send(None)
+        except StopIteration as done:
+            return done.value
+        coro.close()
+        raise RuntimeError(f"{endpoint.__name__} suspended in threadpool mode")
+
+    # Copy the signature but not __wrapped__, which FastAPI would follow back to the coroutine
+    call.__name__ = endpoint.__name__
+    call.__signature__ = inspect.signature(endpoint)
+    return call
+
+class HandlerRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not ASYNC_HANDLERS and inspect.iscoroutinefunction(endpoint):
+            endpoint = run_to_completion(endpoint)
+        super().__init__(path, endpoint, **kwargs)
 
 app = FastAPI(title="Amazon-But-With-Agents Backend")
+app.router.route_class = HandlerRoute
 
 # Enable CORS
 app.add_middleware(
@@ -16,12 +60,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, OPTIONS, PUT, DELETE)
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Catalog-Version", "X-Total-Count", "Idempotent-Replayed"],
 )
 
 # -----------------------------
 # Mock Database (In-Memory)
 # -----------------------------
-from database import products_db, cart_db, orders_db, order_items_db, payments_db
+from database import products_db, catalog_meta, bump_catalog_version
+from events import EventBus
+from idempotency import IdempotencyConflict, IdempotencyStore
+from search import Catalog
+from shards import ShardedCatalog
+from similarity import SimilarityIndex
+from store import Store
+
+# Every mutation below is published here; clients follow it via GET /events
+event_bus = EventBus()
 
 # -----------------------------
 # Enums
@@ -51,6 +105,24 @@ class ProductCreate(BaseModel):
 class ProductRead(ProductCreate):
     id: UUID
 
+# -----------------------------
+# Search Schemas
+# -----------------------------
+class RangeCount(BaseModel):
+    min: Union[int, float]
+    max: Optional[Union[int, float]] = None
+    count: int
+
+class SearchFacets(BaseModel):
+    categories: Dict[str, int]
+    price: List[RangeCount]
+    rating: List[RangeCount]
+
+class SearchResults(BaseModel):
+    results: List[ProductRead]
+    total: int
+    facets: SearchFacets
+
 # -----------------------------
 # Cart Schemas
 # -----------------------------
@@ -80,6 +152,16 @@ class OrderRead(BaseModel):
     status: OrderStatus
     items: List[OrderItemRead]
 
+class OrderStats(BaseModel):
+    orders: int
+    revenue: int
+    count_by_status: Dict[OrderStatus, int]
+    amount_by_status: Dict[OrderStatus, int]
+    units_by_product: Dict[UUID, int]
+    archived: int
+    archived_segments: int
+    archived_bytes: int
+
 # -----------------------------
 # Payment Schemas
 # -----------------------------
@@ -89,70 +171,202 @@ class PaymentCreateIntent(BaseModel):
 class PaymentConfirm(BaseModel):
     payment_id: UUID
 
+# -----------------------------
+# Conditional GET Helpers
+# -----------------------------
+# Clients may keep catalog responses but must revalidate them (cheap with If-None-Match)
+CATALOG_CACHE_CONTROL = "public, no-cache"
+
+def validator_headers(etag: str, last_modified: datetime) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True),
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+        "X-Catalog-Version": str(catalog_meta["version"]),
+    }
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as recommended for GET (RFC 9110 13.1.2)
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # No zone or "-0000": HTTP dates are always GMT
+            since = since.replace(tzinfo=timezone.utc)
+        try:
+            return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+        except TypeError:
+            return False
+    return False
+
+def conditional(request: Request, response: Response, etag: str, last_modified: datetime) -> Optional[Response]:
+    """
+    Return a bare 304 if the client's copy is current, otherwise attach the
+    validators to `response` and return None so the handler builds the body.
+    """
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def catalog_etag() -> str:
+    return 'W/"catalog-%d"' % catalog_meta["version"]
+
+def product_etag(product: dict) -> str:
+    return f'"{product["id"]}-{product["revision"]}"'
+
+# -----------------------------
+# Idempotency
+# -----------------------------
+# Checkout and payment endpoints accept an Idempotency-Key header; a retry with the
+# same key gets the first response (marked Idempotent-Replayed) instead of running again
+idempotency = IdempotencyStore(
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+    blocking=not ASYNC_HANDLERS,
+)
+
+async def idempotent(scope: str, key: Optional[str], payload: BaseModel, response: Response, fn):
+    if key is None:
+        return await fn()
+    fingerprint = hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode("utf-8")).hexdigest()
+    try:
+        result, replayed = await idempotency.run(f"{scope}:{key}", fingerprint, fn)
+    except IdempotencyConflict:
+        raise HTTPException(422, "Idempotency-Key was already used with a different request")
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
 # -----------------------------
 # Products Endpoints
 # -----------------------------
+# Search and point lookups go through the store's catalog: in-process by
+# default, or partitioned across CATALOG_SHARDS worker processes when that is > 1
+CATALOG_SHARDS = int(os.getenv("CATALOG_SHARDS", "1"))
+
+# Precomputed nearest neighbours for /products/{id}/similar, kept current on every add
+SIMILAR_MAX_K = 10
+similarity_index = SimilarityIndex(k=SIMILAR_MAX_K)
+similarity_index.add_many(products_db.values())
+
+store = Store(Catalog(products_db), similarity_index, offload=ASYNC_HANDLERS)
+
+@app.on_event("startup")
+def start_catalog_shards():
+    if CATALOG_SHARDS > 1:
+        store.catalog = ShardedCatalog(CATALOG_SHARDS, products_db.values())
+
+@app.on_event("shutdown")
+def stop_catalog_shards():
+    if isinstance(store.catalog, ShardedCatalog):
+        store.catalog.close()
+
 @app.post("/products", response_model=ProductRead)
-def create_product(product: ProductCreate):
+async def create_product(product: ProductCreate):
     product_id = uuid4()
-    products_db[product_id] = {
+    record = {
         **product.dict(),
         "id": product_id,
         "is_active": True,
         "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "revision": 1,
     }
-    return products_db[product_id]
+    await store.add_product(record)
+    bump_catalog_version()
+    event_bus.publish("products", "product.created", {
+        "id": product_id, "price": product.price, "stock_quantity": product.stock_quantity,
+    })
+    return record
 
 @app.get("/products", response_model=List[ProductRead])
-def list_products():
-    return [p for p in products_db.values() if p["is_active"]]
+async def list_products(request: Request, response: Response):
+    not_modified = conditional(request, response, catalog_etag(), catalog_meta["last_modified"])
+    if not_modified:
+        return not_modified
+    return await store.active_products()
 
 @app.get("/products/categories", response_model=List[str])
-def list_categories():
-    categories = set(p["category"] for p in products_db.values() if p["is_active"])
-    return sorted(list(categories))
-
-@app.get("/products/search", response_model=List[ProductRead])
-def search_products(
+async def list_categories(request: Request, response: Response):
+    not_modified = conditional(request, response, catalog_etag(), catalog_meta["last_modified"])
+    if not_modified:
+        return not_modified
+    return await store.categories()
+
+@app.get("/products/search", response_model=Union[List[ProductRead], SearchResults])
+async def search_products(
+    request: Request,
+    response: Response,
     q: Optional[str] = None,
     category: Optional[str] = None,
     min_price: Optional[int] = None,
     max_price: Optional[int] = None,
     sort: Optional[str] = None,
+    facets: bool = False,
+    limit: Optional[int] = Query(None, gt=0),
 ):
-    results = list_products()
-
-    if q:
-        q_lower = q.lower()
-        results = [p for p in results if q_lower in p["name"].lower() or q_lower in p["description"].lower()]
-    if category:
-        results = [p for p in results if p["category"] == category]
-    if min_price:
-        results = [p for p in results if p["price"] >= min_price]
-    if max_price:
-        results = [p for p in results if p["price"] <= max_price]
-    if sort == "price_asc":
-        results.sort(key=lambda x: x["price"])
-    if sort == "price_desc":
-        results.sort(key=lambda x: x["price"], reverse=True)
+    # Results depend only on the query string (part of the cache key) and the catalog
+    not_modified = conditional(request, response, catalog_etag(), catalog_meta["last_modified"])
+    if not_modified:
+        return not_modified
+
+    results, counts = await store.search(
+        q=q, category=category, min_price=min_price, max_price=max_price,
+        sort=sort, facets=facets, limit=limit,
+    )
 
+    if facets:
+        return {
+            "results": results,
+            "total": counts.pop("total"),
+            "facets": counts,
+        }
     return results
 
 @app.get("/products/{product_id}", response_model=ProductRead)
-def get_product(product_id: UUID):
-    product = products_db.get(product_id)
+async def get_product(product_id: UUID, request: Request, response: Response):
+    product = await store.get_product(product_id)
     if not product or not product["is_active"]:
         raise HTTPException(404, "Product not found")
+    not_modified = conditional(request, response, product_etag(product), product["updated_at"])
+    if not_modified:
+        return not_modified
     return product
 
+@app.get("/products/{product_id}/similar", response_model=List[ProductRead])
+async def similar_products(
+    product_id: UUID,
+    request: Request,
+    response: Response,
+    k: int = Query(5, gt=0, le=SIMILAR_MAX_K),
+):
+    product = await store.get_product(product_id)
+    if not product or not product["is_active"]:
+        raise HTTPException(404, "Product not found")
+    # Neighbour lists change whenever a product is added
+    not_modified = conditional(request, response, catalog_etag(), catalog_meta["last_modified"])
+    if not_modified:
+        return not_modified
+    return (await store.similar(product_id, SIMILAR_MAX_K))[:k]
+
 # -----------------------------
 # Cart Endpoints
 # -----------------------------
 @app.get("/cart", response_model=List[CartItemRead])
-def get_cart():
+async def get_cart():
     response = []
-    for item in cart_db.values():
-        product = products_db.get(item["product_id"])
+    for item in await store.cart_items():
+        product = await store.get_product(item["product_id"])
         response.append({
             "id": item["id"],
             "product": product,
@@ -161,52 +375,58 @@ def get_cart():
     return response
 
 @app.post("/cart", response_model=CartItemRead)
-def add_to_cart(item: CartItemCreate):
-    if item.product_id not in products_db:
+async def add_to_cart(item: CartItemCreate):
+    product = await store.get_product(item.product_id)
+    if not product:
         raise HTTPException(404, "Product not found")
 
     cart_item_id = uuid4()
-    cart_db[cart_item_id] = {
+    await store.add_cart_item({
         "id": cart_item_id,
         "product_id": item.product_id,
         "quantity": item.quantity,
         "created_at": datetime.utcnow(),
-    }
+    })
+    event_bus.publish("cart", "cart.added", {"id": cart_item_id, "product_id": item.product_id, "quantity": item.quantity})
     return {
         "id": cart_item_id,
-        "product": products_db[item.product_id],
+        "product": product,
         "quantity": item.quantity,
     }
 
 @app.put("/cart/{item_id}", response_model=CartItemRead)
-def update_cart_item(item_id: UUID, quantity: int = Query(gt=0)):
-    if item_id not in cart_db:
+async def update_cart_item(item_id: UUID, quantity: int = Query(gt=0)):
+    cart_item = await store.update_cart_item(item_id, quantity)
+    if not cart_item:
         raise HTTPException(404, "Cart item not found")
-    cart_db[item_id]["quantity"] = quantity
-    product = products_db[cart_db[item_id]["product_id"]]
+    event_bus.publish("cart", "cart.updated", {"id": item_id, "quantity": quantity})
+    product = await store.get_product(cart_item["product_id"])
     return {"id": item_id, "product": product, "quantity": quantity}
 
 @app.delete("/cart/{item_id}")
-def delete_cart_item(item_id: UUID):
-    if item_id not in cart_db:
+async def delete_cart_item(item_id: UUID):
+    if not await store.remove_cart_items([item_id]):
         raise HTTPException(404, "Cart item not found")
-    del cart_db[item_id]
+    event_bus.publish("cart", "cart.removed", {"id": item_id})
     return {"success": True}
 
 # -----------------------------
 # Orders Endpoints
 # -----------------------------
 @app.post("/orders", response_model=OrderRead)
-def create_order(order: OrderCreate):
+async def create_order(order: OrderCreate, response: Response, idempotency_key: Optional[str] = Header(None)):
+    return await idempotent("orders", idempotency_key, order, response, lambda: place_order(order))
+
+async def place_order(order: OrderCreate) -> dict:
     items = []
     total = 0
 
     for cart_item_id in order.cart_item_ids:
-        cart_item = cart_db.get(cart_item_id)
+        cart_item = await store.get_cart_item(cart_item_id)
         if not cart_item:
             raise HTTPException(404, "Cart item not found")
 
-        product = products_db[cart_item["product_id"]]
+        product = await store.get_product(cart_item["product_id"])
         price = product["price"]
         quantity = cart_item["quantity"]
         total += price * quantity
@@ -218,45 +438,85 @@ def create_order(order: OrderCreate):
         })
 
     order_id = uuid4()
-    orders_db[order_id] = {
+    record = {
         "id": order_id,
         "total_amount": total,
         "status": OrderStatus.pending,
         "created_at": datetime.utcnow(),
     }
-    order_items_db[order_id] = items
+    await store.add_order(record, items)
 
     # clear cart items
-    for cid in order.cart_item_ids:
-        cart_db.pop(cid, None)
+    for cid in await store.remove_cart_items(order.cart_item_ids):
+        event_bus.publish("cart", "cart.removed", {"id": cid})
+    event_bus.publish("orders", "order.created", {"id": order_id, "total_amount": total, "status": OrderStatus.pending.value})
 
-    return {**orders_db[order_id], "items": items}
+    return {**record, "items": items}
 
 @app.get("/orders", response_model=List[OrderRead])
-def list_orders():
-    return [
-        {**order, "items": order_items_db[oid]}
-        for oid, order in orders_db.items()
-    ]
+async def list_orders(
+    response: Response,
+    status: Optional[OrderStatus] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, gt=0),
+):
+    """
+    Orders oldest first. Without `limit` every match is returned;
+    X-Total-Count carries the number of matches for paging.
+    """
+    orders, total = await store.list_orders(
+        status=status, created_after=created_after, created_before=created_before,
+        offset=offset, limit=limit,
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return orders
+
+@app.get("/orders/stats", response_model=OrderStats)
+async def order_stats():
+    return await store.order_stats()
 
 @app.get("/orders/{order_id}", response_model=OrderRead)
-def get_order(order_id: UUID):
-    order = orders_db.get(order_id)
+async def get_order(order_id: UUID):
+    order = await store.get_order(order_id)
     if not order:
         raise HTTPException(404, "Order not found")
-    return {**order, "items": order_items_db[order_id]}
+    return order
+
+# Paid orders older than the retention window are moved to compressed cold segments
+ORDER_RETENTION_DAYS = float(os.getenv("ORDER_RETENTION_DAYS", "30"))
+ORDER_ARCHIVE_INTERVAL = float(os.getenv("ORDER_ARCHIVE_INTERVAL", "3600"))
+ORDER_SEGMENT_SIZE = int(os.getenv("ORDER_SEGMENT_SIZE", "1000"))
+
+async def archive_orders_periodically():
+    while True:
+        cutoff = datetime.utcnow() - timedelta(days=ORDER_RETENTION_DAYS)
+        await store.archive_orders(cutoff, ORDER_SEGMENT_SIZE)
+        await asyncio.sleep(ORDER_ARCHIVE_INTERVAL)
+
+@app.on_event("startup")
+async def start_order_archiver():
+    app.state.order_archiver = asyncio.create_task(archive_orders_periodically())
+
+@app.on_event("shutdown")
+async def stop_order_archiver():
+    app.state.order_archiver.cancel()
 
 # -----------------------------
 # Payments Endpoints (Mocked)
 # -----------------------------
 @app.post("/payments/create-intent")
-def create_payment_intent(payload: PaymentCreateIntent):
-    order = orders_db.get(payload.order_id)
+async def create_payment_intent(payload: PaymentCreateIntent, response: Response, idempotency_key: Optional[str] = Header(None)):
+    return await idempotent("payments/create-intent", idempotency_key, payload, response, lambda: open_payment_intent(payload))
+
+async def open_payment_intent(payload: PaymentCreateIntent) -> dict:
+    order = await store.get_order(payload.order_id)
     if not order:
         raise HTTPException(404, "Order not found")
 
     payment_id = uuid4()
-    payments_db[payment_id] = {
+    payment = {
         "id": payment_id,
         "order_id": payload.order_id,
         "provider": "stripe",
@@ -266,20 +526,57 @@ def create_payment_intent(payload: PaymentCreateIntent):
         "status": PaymentStatus.pending,
         "created_at": datetime.utcnow(),
     }
-    return payments_db[payment_id]
+    await store.add_payment(payment)
+    return payment
 
 @app.post("/payments/confirm")
-def confirm_payment(payload: PaymentConfirm):
-    payment = payments_db.get(payload.payment_id)
+async def confirm_payment(payload: PaymentConfirm, response: Response, idempotency_key: Optional[str] = Header(None)):
+    return await idempotent("payments/confirm", idempotency_key, payload, response, lambda: complete_payment(payload))
+
+async def complete_payment(payload: PaymentConfirm) -> dict:
+    payment = await store.get_payment(payload.payment_id)
     if not payment:
         raise HTTPException(404, "Payment not found")
 
     payment["status"] = PaymentStatus.succeeded
-    order = orders_db[payment["order_id"]]
-    order["status"] = OrderStatus.paid
+    await store.set_order_status(payment["order_id"], OrderStatus.paid)
+    event_bus.publish("orders", "order.updated", {"id": payment["order_id"], "status": OrderStatus.paid.value})
 
     return {"success": True, "order_id": payment["order_id"]}
 
+# -----------------------------
+# Change Feed Endpoint
+# -----------------------------
+EVENTS_HEARTBEAT_SECONDS = 15
+
+@app.get("/events")
+async def stream_events(request: Request, since: Optional[int] = None, topics: Optional[str] = None):
+    """
+    Server-Sent Events feed of cart, order and product changes.
+    Resume with ?since=<offset> or the standard Last-Event-ID header
+    ("<epoch>-<offset>"); filter with ?topics=cart,orders,products.
+    """
+    epoch = None
+    last_event_id = request.headers.get("last-event-id")
+    if since is None and last_event_id:
+        epoch, since = event_bus.parse_id(last_event_id)
+    topic_list = [t for t in topics.split(",") if t] if topics else None
+    # A stale resume point (from before a restart) starts at the current offset after a reset
+    start = event_bus.last_offset if since is None or event_bus.is_stale(since, epoch) else since
+    stream = event_bus.subscribe(since, topic_list, heartbeat=EVENTS_HEARTBEAT_SECONDS, epoch=epoch)
+
+    async def event_stream():
+        # Tell the client where it starts so it can resume even before any event arrives
+        yield f"id: {event_bus.format_id(start)}\nretry: 3000\n\n"
+        async for offset, topic, payload in stream:
+            if not payload:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event_bus.format_id(offset)}\ndata: {payload}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,204 @@
+import json
+import zlib
+import bisect
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+# -----------------------------
+# Cold Segments
+# -----------------------------
+def _status_value(status) -> str:
+    return getattr(status, "value", status)
+
+def _naive_utc(value: datetime) -> datetime:
+    # Orders are stamped with naive UTC; aware bounds from query strings are converted to match
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def encode_segment(records: List[Tuple[dict, List[dict]]]) -> bytes:
+    """
+    Serialize (order, items) pairs into one zlib-compressed JSON blob.
+    """
+    rows = [
+        {
+            "id": str(order["id"]),
+            "total_amount": order["total_amount"],
+            "status": _status_value(order["status"]),
+            "created_at": order["created_at"].isoformat(),
+            "items": [[str(i["product_id"]), i["quantity"], i["price_at_purchase"]] for i in items],
+        }
+        for order, items in records
+    ]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode("utf-8"), 6)
+
+def decode_segment(blob: bytes) -> Dict[UUID, dict]:
+    orders = {}
+    for row in json.loads(zlib.decompress(blob)):
+        order_id = UUID(row["id"])
+        orders[order_id] = {
+            "id": order_id,
+            "total_amount": row["total_amount"],
+            "status": row["status"],
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "items": [
+                {"product_id": UUID(pid), "quantity": quantity, "price_at_purchase": price}
+                for pid, quantity, price in row["items"]
+            ],
+        }
+    return orders
+
+# -----------------------------
+# Order Book
+# -----------------------------
+class OrderBook:
+    """
+    Orders with secondary indexes and running aggregates.
+
+    Every order, hot or archived, has a (created_at, id) key in `_created` and
+    in the sorted list for its status, so filtered and paginated listings are
+    two bisects and a slice. Aggregates are updated on each write, so stats
+    never rescan orders.
+
+    Recent and unpaid orders stay as dicts in `orders` / `items` (the tables
+    from database.py). Paid orders older than the retention window can be
+    archived into zlib-compressed segments; only their index entries stay
+    uncompressed, and a few decoded segments are cached for reads.
+    """
+
+    def __init__(self, orders: dict, items: dict, segment_cache: int = 4):
+        self.orders = orders
+        self.items = items
+        self._keys: Dict[UUID, Tuple[datetime, UUID]] = {}
+        self._created: List[Tuple[datetime, UUID]] = []
+        self._by_status: Dict[str, List[Tuple[datetime, UUID]]] = {}
+        self._segment_of: Dict[UUID, int] = {}
+        self._segments: List[bytes] = []
+        self._segment_cache: "OrderedDict[int, Dict[UUID, dict]]" = OrderedDict()
+        self._segment_cache_size = segment_cache
+
+        self.count_by_status: Counter = Counter()
+        self.amount_by_status: Counter = Counter()
+        self.units_by_product: Counter = Counter()
+
+        for order_id, order in list(orders.items()):
+            self._index(order, items[order_id])
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _index(self, order: dict, items: List[dict]) -> None:
+        key = (order["created_at"], order["id"])
+        status = _status_value(order["status"])
+        self._keys[order["id"]] = key
+        bisect.insort(self._created, key)
+        bisect.insort(self._by_status.setdefault(status, []), key)
+        self.count_by_status[status] += 1
+        self.amount_by_status[status] += order["total_amount"]
+        for item in items:
+            self.units_by_product[item["product_id"]] += item["quantity"]
+
+    # Writes
+    def add(self, order: dict, items: List[dict]) -> None:
+        self.orders[order["id"]] = order
+        self.items[order["id"]] = items
+        self._index(order, items)
+
+    def set_status(self, order_id: UUID, status) -> bool:
+        """
+        Move an order to `status`. Returns False if it was already there.
+        """
+        order = self.get(order_id)
+        old, new = _status_value(order["status"]), _status_value(status)
+        if old == new:
+            return False
+        # Only hot orders change status; archived orders are paid, which is final
+        self.orders[order_id]["status"] = status
+
+        key = self._keys[order_id]
+        keys = self._by_status[old]
+        del keys[bisect.bisect_left(keys, key)]
+        bisect.insort(self._by_status.setdefault(new, []), key)
+        self.count_by_status[old] -= 1
+        self.count_by_status[new] += 1
+        self.amount_by_status[old] -= order["total_amount"]
+        self.amount_by_status[new] += order["total_amount"]
+        return True
+
+    # Reads
+    def get(self, order_id: UUID) -> Optional[dict]:
+        order = self.orders.get(order_id)
+        if order is not None:
+            return {**order, "items": self.items[order_id]}
+        segment = self._segment_of.get(order_id)
+        if segment is None:
+            return None
+        return self._segment(segment)[order_id]
+
+    def _segment(self, segment: int) -> Dict[UUID, dict]:
+        cached = self._segment_cache.get(segment)
+        if cached is None:
+            cached = decode_segment(self._segments[segment])
+            self._segment_cache[segment] = cached
+            if len(self._segment_cache) > self._segment_cache_size:
+                self._segment_cache.popitem(last=False)
+        else:
+            self._segment_cache.move_to_end(segment)
+        return cached
+
+    def query(
+        self,
+        status=None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[dict], int]:
+        """
+        Orders in created_at order, filtered by status and [created_after,
+        created_before). Returns one page and the total number of matches.
+        """
+        keys = self._created if status is None else self._by_status.get(_status_value(status), [])
+        lo = bisect.bisect_left(keys, (_naive_utc(created_after),)) if created_after else 0
+        hi = bisect.bisect_left(keys, (_naive_utc(created_before),)) if created_before else len(keys)
+        total = max(hi - lo, 0)
+        start = lo + offset
+        stop = hi if limit is None else min(hi, start + limit)
+        return [self.get(order_id) for _, order_id in keys[start:stop]], total
+
+    def stats(self) -> dict:
+        return {
+            "orders": len(self._keys),
+            "revenue": self.amount_by_status["paid"],
+            "count_by_status": {s: n for s, n in self.count_by_status.items() if n},
+            "amount_by_status": {s: a for s, a in self.amount_by_status.items() if self.count_by_status[s]},
+            "units_by_product": dict(self.units_by_product),
+            "archived": len(self._segment_of),
+            "archived_segments": len(self._segments),
+            "archived_bytes": sum(len(s) for s in self._segments),
+        }
+
+    # Archiving
+    def archivable(self, cutoff: datetime) -> List[Tuple[dict, List[dict]]]:
+        """
+        Hot paid orders created before `cutoff`, oldest first.
+        """
+        keys = self._by_status.get("paid", [])
+        return [
+            (self.orders[order_id], self.items[order_id])
+            for _, order_id in keys[:bisect.bisect_left(keys, (cutoff,))]
+            if order_id in self.orders
+        ]
+
+    def install_segment(self, order_ids: List[UUID], blob: bytes) -> None:
+        """
+        Replace the given hot orders with an encoded segment holding them.
+        """
+        segment = len(self._segments)
+        self._segments.append(blob)
+        for order_id in order_ids:
+            self._segment_of[order_id] = segment
+            del self.orders[order_id]
+            del self.items[order_id]
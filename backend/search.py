@@ -0,0 +1,400 @@
+import re
+import heapq
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+# -----------------------------
+# Text Normalization
+# -----------------------------
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+# Suffixes are only stripped if at least this much of the word is left
+MIN_STEM = 4
+VOWELS = set("aeiou")
+
+def singular(token: str) -> str:
+    """
+    Strip an English plural ending ("batteries" -> "batterie", "boxes" -> "box").
+    """
+    if token.isdigit() or len(token) < MIN_STEM:
+        return token
+    if token.endswith("ies") and len(token) > MIN_STEM:
+        return token[:-1]
+    if token.endswith(("sses", "xes", "zes", "ches", "shes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def stem(token: str) -> str:
+    """
+    Light English suffix stripping, enough to fold plurals and simple verb forms
+    onto the singular's stem ("earrings" and "earring" -> "earr", "batteries"
+    and "battery" -> "batteri", "cookies" and "cookie" -> "cooki").
+    """
+    # Plurals first, so the singular and plural go through the same rules below
+    token = singular(token)
+    if token.isdigit() or len(token) < MIN_STEM:
+        return token
+    if token.endswith("ing") and len(token) - 3 >= MIN_STEM:
+        return token[:-3]
+    if token.endswith("ed") and len(token) - 2 >= MIN_STEM:
+        return token[:-2]
+    # "battery"/"batteries" and "cookie"/"cookies" meet at a trailing "i"
+    if token.endswith("y") and token[-2] not in VOWELS:
+        return token[:-1] + "i"
+    if token.endswith("ie"):
+        return token[:-1]
+    return token
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_edits(term: str) -> int:
+    if term.isdigit() or len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 6 else 2
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance between a and b, or limit + 1 as soon as it must exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+# -----------------------------
+# Product Search Index
+# -----------------------------
+# Terms from the name count for more than terms only found in the description
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+class ProductSearchIndex:
+    """
+    Inverted index from stemmed terms to products, plus a trigram index over
+    the term vocabulary.
+
+    A query term is resolved against the vocabulary (exact stem, prefix or
+    substring, or within a small edit distance), never against the products
+    themselves, so lookups scale with the number of distinct words rather than
+    the size of the catalog. Every query term must match for a product to be
+    returned; results are ordered by relevance.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[UUID, float]] = defaultdict(dict)
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._order: Dict[UUID, int] = {}
+
+    def add(self, product: dict) -> None:
+        weights: Dict[str, float] = {}
+        # The singular is indexed too, so misspelled queries are still within
+        # edit distance of a word when its stem is much shorter ("earings" -> "earring")
+        for token in tokenize(product["description"]):
+            weights[stem(token)] = weights[singular(token)] = DESCRIPTION_WEIGHT
+        for token in tokenize(product["name"]):
+            weights[stem(token)] = weights[singular(token)] = NAME_WEIGHT
+        self._order.setdefault(product["id"], len(self._order))
+
+        for term, weight in weights.items():
+            if term not in self._postings:
+                for gram in trigrams(term):
+                    self._grams[gram].add(term)
+            self._postings[term][product["id"]] = weight
+
+    def _resolve(self, term: str) -> Dict[str, float]:
+        """
+        Vocabulary terms matching `term`, with a similarity in (0, 1].
+        """
+        matches = {}
+        if term in self._postings:
+            matches[term] = 1.0
+
+        grams = trigrams(term)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] += 1
+
+        limit = max_edits(term)
+        # A single edit destroys at most three trigrams
+        min_shared = len(grams) - 3 * limit
+        for candidate, count in shared.items():
+            if candidate in matches:
+                continue
+            if len(term) >= 3 and term in candidate:
+                matches[candidate] = 0.8 if candidate.startswith(term) else 0.6
+            elif limit and count >= min_shared:
+                distance = bounded_levenshtein(term, candidate, limit)
+                if distance <= limit:
+                    matches[candidate] = 0.7 - 0.2 * (distance - 1)
+        return matches
+
+    def scores(self, query: str) -> Dict[UUID, float]:
+        terms = {stem(token) for token in tokenize(query)}
+        if not terms:
+            return {}
+
+        scores: Dict[UUID, float] = {}
+        for i, term in enumerate(terms):
+            term_scores: Dict[UUID, float] = {}
+            for candidate, similarity in self._resolve(term).items():
+                for product_id, weight in self._postings[candidate].items():
+                    score = similarity * weight
+                    if score > term_scores.get(product_id, 0.0):
+                        term_scores[product_id] = score
+
+            if i == 0:
+                scores = term_scores
+            else:
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return {}
+        return scores
+
+    def search(self, query: str) -> List[UUID]:
+        scores = self.scores(query)
+        # Ties keep catalog order
+        return sorted(scores, key=lambda pid: (-scores[pid], self._order[pid]))
+
+# -----------------------------
+# Facet Bitsets
+# -----------------------------
+# Bucket edges in cents / stars; a bucket is [edge[i], edge[i + 1])
+PRICE_EDGES = [0, 2500, 5000, 10000, 25000, 50000, 100000]
+RATING_EDGES = [0.0, 3.5, 4.0, 4.5]
+
+def _bucket(edges: List, value) -> int:
+    return bisect_right(edges, value) - 1 if value >= edges[0] else 0
+
+class FacetIndex:
+    """
+    Every product gets a bit position; each category, price bucket and rating
+    band keeps a Python int as a bitset of its products. Filters become ANDs
+    and facet counts become popcounts over whole bitsets, instead of a scan
+    over the catalog per facet.
+    """
+
+    def __init__(self):
+        self._slots: Dict[UUID, int] = {}
+        self._ids: List[UUID] = []
+        self._prices: List[int] = []
+        self.active = 0
+        self.categories: Dict[str, int] = defaultdict(int)
+        self.price_buckets = [0] * len(PRICE_EDGES)
+        self.rating_bands = [0] * len(RATING_EDGES)
+
+    def add(self, product: dict) -> None:
+        slot = self._slots.get(product["id"])
+        if slot is None:
+            slot = len(self._ids)
+            self._slots[product["id"]] = slot
+            self._ids.append(product["id"])
+            self._prices.append(product["price"])
+        bit = 1 << slot
+        if product.get("is_active", True):
+            self.active |= bit
+        self.categories[product["category"]] |= bit
+        self.price_buckets[_bucket(PRICE_EDGES, product["price"])] |= bit
+        self.rating_bands[_bucket(RATING_EDGES, product["rating"])] |= bit
+
+    def _mask_from_slots(self, slots) -> int:
+        # OR-ing single bits into a big int copies it every time; build the bytes once
+        buf = bytearray((len(self._ids) >> 3) + 1)
+        for slot in slots:
+            buf[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(buf, "little")
+
+    def mask_of(self, product_ids) -> int:
+        slots = self._slots
+        return self._mask_from_slots(slots[pid] for pid in product_ids if pid in slots)
+
+    def contains(self, mask: int, product_id: UUID) -> bool:
+        slot = self._slots.get(product_id)
+        return slot is not None and bool(mask >> slot & 1)
+
+    def ids_of(self, mask: int) -> List[UUID]:
+        """
+        Products whose bits are set, in slot order.
+        """
+        bits = bin(mask)[:1:-1]  # least significant bit first
+        ids = []
+        slot = bits.find("1")
+        while slot != -1:
+            ids.append(self._ids[slot])
+            slot = bits.find("1", slot + 1)
+        return ids
+
+    def price_mask(self, min_price: Optional[int] = None, max_price: Optional[int] = None) -> int:
+        """
+        Whole buckets inside the range are ORed in; only the (at most two)
+        boundary buckets are checked product by product.
+        """
+        low = min_price if min_price is not None else PRICE_EDGES[0]
+        high = max_price if max_price is not None else float("inf")
+        mask = 0
+        boundary = []
+        for i, bucket in enumerate(self.price_buckets):
+            start = PRICE_EDGES[i]
+            end = PRICE_EDGES[i + 1] if i + 1 < len(PRICE_EDGES) else float("inf")
+            if start >= low and end - 1 <= high:
+                mask |= bucket
+            elif end > low and start <= high:
+                boundary.extend(
+                    self._slots[pid] for pid in self.ids_of(bucket)
+                    if low <= self._prices[self._slots[pid]] <= high
+                )
+        return mask | self._mask_from_slots(boundary)
+
+    def counts(self, base: int, category_mask: int, price_mask: int) -> dict:
+        """
+        Facet counts for a match. Each facet ignores its own filter, so the
+        client can show how many results picking another value would give.
+        """
+        by_price = base & category_mask
+        by_category = base & price_mask
+        both = by_price & price_mask
+        return {
+            "total": both.bit_count(),
+            "categories": {
+                name: (bitset & by_category).bit_count()
+                for name, bitset in sorted(self.categories.items())
+                if bitset & by_category
+            },
+            "price": [
+                {
+                    "min": PRICE_EDGES[i],
+                    "max": PRICE_EDGES[i + 1] if i + 1 < len(PRICE_EDGES) else None,
+                    "count": (bucket & by_price).bit_count(),
+                }
+                for i, bucket in enumerate(self.price_buckets)
+            ],
+            "rating": [
+                {
+                    "min": RATING_EDGES[i],
+                    "max": RATING_EDGES[i + 1] if i + 1 < len(RATING_EDGES) else None,
+                    "count": (band & both).bit_count(),
+                }
+                for i, band in enumerate(self.rating_bands)
+            ],
+        }
+
+# -----------------------------
+# Catalog
+# -----------------------------
+def sort_key(product: dict, sort: Optional[str], score: Optional[float]) -> tuple:
+    """
+    Total order for search results. Keys are comparable across catalogs, which
+    lets sharded results be combined with a k-way merge.
+    """
+    key = ()
+    if sort == "price_asc":
+        key = (product["price"],)
+    elif sort == "price_desc":
+        key = (-product["price"],)
+    if score is not None:
+        key += (-score,)
+    return key + (product["created_at"], product["id"])
+
+def merge_facet_counts(all_counts: List[dict]) -> dict:
+    merged = {"total": 0, "categories": defaultdict(int), "price": None, "rating": None}
+    for counts in all_counts:
+        merged["total"] += counts["total"]
+        for name, count in counts["categories"].items():
+            merged["categories"][name] += count
+        for facet in ("price", "rating"):
+            if merged[facet] is None:
+                merged[facet] = [dict(bucket) for bucket in counts[facet]]
+            else:
+                for total, bucket in zip(merged[facet], counts[facet]):
+                    total["count"] += bucket["count"]
+    merged["categories"] = dict(sorted(merged["categories"].items()))
+    return merged
+
+class Catalog:
+    """
+    A set of products together with their text and facet indexes.
+    The backend keeps one over products_db; each shard worker keeps one over
+    its own partition.
+
+    Adds and searches may run on different threads (the backend offloads both
+    to the threadpool), so they take a lock: the indexes are plain dicts and
+    lists that a search iterates while an add grows them.
+    """
+
+    # Every call returns without waiting on anything outside this process
+    blocking = False
+
+    def __init__(self, products: Optional[dict] = None):
+        self.products = products if products is not None else {}
+        self.text = ProductSearchIndex()
+        self.facets = FacetIndex()
+        self._lock = threading.Lock()
+        for product in self.products.values():
+            self._index(product)
+
+    def _index(self, product: dict) -> None:
+        self.text.add(product)
+        self.facets.add(product)
+
+    def add(self, product: dict) -> None:
+        with self._lock:
+            self.products[product["id"]] = product
+            self._index(product)
+
+    def get(self, product_id: UUID) -> Optional[dict]:
+        return self.products.get(product_id)
+
+    def search_keyed(
+        self,
+        q: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        sort: Optional[str] = None,
+        facets: bool = False,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Tuple[tuple, dict]], Optional[dict]]:
+        """
+        Matching products as (sort key, product) in order, plus facet counts
+        when requested. Filters are bitset ANDs over the facet index.
+        """
+        with self._lock:
+            base = self.facets.active
+            scores = None
+            if q:
+                scores = self.text.scores(q)
+                base &= self.facets.mask_of(scores)
+            category_mask = self.facets.categories.get(category, 0) if category else -1
+            price_mask = self.facets.price_mask(min_price or None, max_price or None) if (min_price or max_price) else -1
+
+            match = base & category_mask & price_mask
+            keyed = (
+                (sort_key(self.products[pid], sort, scores[pid] if scores is not None else None), self.products[pid])
+                for pid in self.facets.ids_of(match)
+            )
+            ordered = heapq.nsmallest(limit, keyed, key=lambda kp: kp[0]) if limit else sorted(keyed, key=lambda kp: kp[0])
+            counts = self.facets.counts(base, category_mask, price_mask) if facets else None
+            return ordered, counts
+
+    def search(self, *args, **kwargs) -> Tuple[List[dict], Optional[dict]]:
+        ordered, counts = self.search_keyed(*args, **kwargs)
+        return [product for _, product in ordered], counts
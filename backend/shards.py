@@ -0,0 +1,160 @@
+import sys
+import heapq
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from search import Catalog, merge_facet_counts
+
+# -----------------------------
+# Shard Worker
+# -----------------------------
+def _shard_worker(conn) -> None:
+    """
+    Owns one partition of the catalog and answers requests sent over `conn`
+    until it receives "stop". Each request is (op, payload); each reply is
+    (ok, result).
+    """
+    catalog = Catalog()
+    while True:
+        op, payload = conn.recv()
+        try:
+            if op == "stop":
+                conn.send((True, None))
+                return
+            if op == "add":
+                for product in payload:
+                    catalog.add(product)
+                result = None
+            elif op == "get":
+                result = catalog.get(payload)
+            elif op == "search":
+                result = catalog.search_keyed(**payload)
+            elif op == "count":
+                result = len(catalog.products)
+            else:
+                raise ValueError(f"Unknown shard op: {op}")
+            conn.send((True, result))
+        except Exception as e:
+            conn.send((False, repr(e)))
+
+@contextmanager
+def _workers_main():
+    """
+    spawn re-runs the parent's __main__ in every child, which for
+    `python main.py` means generating a whole products_db and building the
+    app's indexes in each shard. While workers start, make this module the
+    one they re-run instead.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+# -----------------------------
+# Sharded Catalog
+# -----------------------------
+class ShardedCatalog:
+    """
+    Catalog partitioned across worker processes by product id.
+
+    Point lookups go to the shard that owns the id. Searches are sent to every
+    shard before any reply is read, so the shards work in parallel; each
+    returns its matches already ordered (and cut to `limit`), and the partial
+    lists are combined with a k-way heap merge. Facet counts are summed.
+
+    Each shard has one pipe guarded by a lock. Locks are always taken in shard
+    order, so concurrent requests pipeline through the shards without deadlock.
+    """
+
+    # Every call waits on worker processes
+    blocking = True
+
+    def __init__(self, num_shards: int, products: Iterable[dict] = ()):
+        # spawn keeps workers free of the server's threads and open sockets
+        ctx = multiprocessing.get_context("spawn")
+        self.num_shards = num_shards
+        self._conns = []
+        self._locks = []
+        self._procs = []
+        with _workers_main():
+            for i in range(num_shards):
+                parent_conn, child_conn = ctx.Pipe()
+                proc = ctx.Process(target=_shard_worker, args=(child_conn,), name=f"catalog-shard-{i}", daemon=True)
+                proc.start()
+                child_conn.close()
+                self._conns.append(parent_conn)
+                self._locks.append(threading.Lock())
+                self._procs.append(proc)
+        self.add_many(products)
+
+    def shard_for(self, product_id: UUID) -> int:
+        return product_id.int % self.num_shards
+
+    def _call(self, shard: int, op: str, payload=None):
+        with self._locks[shard]:
+            self._conns[shard].send((op, payload))
+            return self._unwrap(self._conns[shard].recv())
+
+    def _scatter(self, op: str, payloads: List) -> List:
+        """
+        Send payloads[i] to shard i (skipping None), then gather the replies.
+        """
+        sent = []
+        try:
+            for shard, payload in enumerate(payloads):
+                if payload is None:
+                    continue
+                self._locks[shard].acquire()
+                sent.append(shard)
+                self._conns[shard].send((op, payload))
+            return [self._unwrap(self._conns[shard].recv()) for shard in sent]
+        finally:
+            for shard in sent:
+                self._locks[shard].release()
+
+    @staticmethod
+    def _unwrap(reply):
+        ok, result = reply
+        if not ok:
+            raise RuntimeError(f"Catalog shard failed: {result}")
+        return result
+
+    def add(self, product: dict) -> None:
+        self._call(self.shard_for(product["id"]), "add", [product])
+
+    def add_many(self, products: Iterable[dict]) -> None:
+        partitions = [[] for _ in range(self.num_shards)]
+        for product in products:
+            partitions[self.shard_for(product["id"])].append(product)
+        self._scatter("add", [p or None for p in partitions])
+
+    def get(self, product_id: UUID) -> Optional[dict]:
+        return self._call(self.shard_for(product_id), "get", product_id)
+
+    def counts(self) -> List[int]:
+        return self._scatter("count", [True] * self.num_shards)
+
+    def search(self, limit: Optional[int] = None, facets: bool = False, **filters) -> Tuple[List[dict], Optional[dict]]:
+        payload = {**filters, "facets": facets, "limit": limit}
+        replies = self._scatter("search", [payload] * self.num_shards)
+
+        merged = heapq.merge(*(ordered for ordered, _ in replies), key=lambda kp: kp[0])
+        results = [product for _, product in merged]
+        if limit:
+            results = results[:limit]
+        counts = merge_facet_counts([c for _, c in replies]) if facets else None
+        return results, counts
+
+    def close(self) -> None:
+        for shard in range(self.num_shards):
+            try:
+                self._call(shard, "stop")
+            except (EOFError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
@@ -0,0 +1,214 @@
+import os
+import re
+import time
+import heapq
+import asyncio
+import itertools
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+# -----------------------------
+# Admission Settings
+# -----------------------------
+MAX_CONCURRENT = int(os.getenv("AGENT_MAX_CONCURRENT", "16"))
+MAX_PER_CLIENT = int(os.getenv("AGENT_MAX_PER_CLIENT", "2"))
+MAX_QUEUE = int(os.getenv("AGENT_MAX_QUEUE", "256"))
+# Requests expected to wait longer than this (seconds) are shed up front.
+MAX_QUEUE_WAIT = float(os.getenv("AGENT_MAX_QUEUE_WAIT", "10"))
+
+# Lower value is served first
+PRIORITY_CHECKOUT = 0
+PRIORITY_DEFAULT = 1
+
+# Only explicit checkout commands: "buy", "purchase" or "check out <product>"
+# are usually browsing ("where can I buy ...", "check out this laptop").
+_CHECKOUT_PATTERN = re.compile(r"""
+    \bcheckout\b
+  | \bcheck\ out\b (?=\s*(?:(?:my|the)\s+cart\b|now\b|[.!]*\s*$))
+  | \bpay\b (?=\s*(?:for\s+)?(?:(?:my|the|this|that)\s+)?order\b|\s*now\b|[.!]*\s*$)
+  | \bplace\s+(?:(?:my|the|an|this)\s+)?order\b
+  | \b(?:complete|confirm)\s+(?:(?:my|the)\s+)?(?:order|purchase|payment)\b
+""", re.IGNORECASE | re.VERBOSE)
+
+def classify_priority(text: Optional[str], resuming: bool = False) -> int:
+    """
+    Checkout and payment turns (including resumed interrupts) jump the queue.
+    """
+    if resuming or (text and _CHECKOUT_PATTERN.search(text)):
+        return PRIORITY_CHECKOUT
+    return PRIORITY_DEFAULT
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    client_id: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+@dataclass
+class Ticket:
+    client_id: str
+    admitted_at: float
+    released: bool = False
+
+
+class StageMetrics:
+    """
+    Count, mean, max and recent percentiles for one stage (queue wait or run time).
+    """
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean() * 1000, 2),
+            "p50_ms": round(self.percentile(0.50) * 1000, 2),
+            "p95_ms": round(self.percentile(0.95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class AdmissionController:
+    """
+    Global and per-client concurrency limit in front of graph execution.
+
+    Requests that cannot start immediately wait in a priority queue. A request
+    is rejected up front when its client is over its limit, the queue is full,
+    or the expected wait (queue position x mean run time / slots) exceeds
+    `max_wait`; a queued request that still waits longer is rejected too.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT,
+        max_per_client: int = MAX_PER_CLIENT,
+        max_queue: int = MAX_QUEUE,
+        max_wait: float = MAX_QUEUE_WAIT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_client = max_per_client
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._per_client = defaultdict(int)
+        self._queue: list = []
+        self._seq = itertools.count()
+        self.queue_wait = StageMetrics()
+        self.run_time = StageMetrics()
+        self.admitted = 0
+        self.rejected = defaultdict(int)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for w in self._queue if not w.future.done())
+
+    def expected_wait(self, position: int) -> float:
+        return (position + 1) * self.run_time.mean() / self.max_concurrent
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        return AdmissionRejected(reason, max(retry_after, 1.0))
+
+    async def acquire(self, client_id: str, priority: int = PRIORITY_DEFAULT) -> Ticket:
+        if self._per_client.get(client_id, 0) >= self.max_per_client:
+            raise self._reject("client_limit", self.run_time.mean())
+
+        now = time.monotonic()
+        if self.active < self.max_concurrent and not self.queue_depth:
+            return self._admit(client_id, now, now)
+
+        depth = self.queue_depth
+        if depth >= self.max_queue:
+            raise self._reject("queue_full", self.expected_wait(depth))
+        if self.expected_wait(depth) > self.max_wait:
+            raise self._reject("overloaded", self.expected_wait(depth))
+
+        waiter = _Waiter(priority, next(self._seq), client_id, asyncio.get_running_loop().create_future(), now)
+        heapq.heappush(self._queue, waiter)
+        self._per_client[client_id] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the timeout fired; hand the slot back
+                self.release(waiter.future.result())
+            else:
+                waiter.future.cancel()
+                self._drop_client(client_id)
+            raise self._reject("queue_timeout", self.expected_wait(self.queue_depth))
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(waiter.future.result())
+            else:
+                waiter.future.cancel()
+                self._drop_client(client_id)
+            raise
+
+    def _admit(self, client_id: str, enqueued_at: float, now: float, queued: bool = False) -> Ticket:
+        self.active += 1
+        if not queued:
+            self._per_client[client_id] += 1
+        self.admitted += 1
+        self.queue_wait.observe(now - enqueued_at)
+        return Ticket(client_id, now)
+
+    def _drop_client(self, client_id: str) -> None:
+        self._per_client[client_id] -= 1
+        if self._per_client[client_id] <= 0:
+            del self._per_client[client_id]
+
+    def release(self, ticket: Ticket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        now = time.monotonic()
+        self.run_time.observe(now - ticket.admitted_at)
+        self.active -= 1
+        self._drop_client(ticket.client_id)
+
+        while self._queue and self.active < self.max_concurrent:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue  # timed out or cancelled while queued
+            waiter.future.set_result(self._admit(waiter.client_id, waiter.enqueued_at, now, queued=True))
+
+    def snapshot(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "max_concurrent": self.max_concurrent,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "stages": {"queue": self.queue_wait.snapshot(), "run": self.run_time.snapshot()},
+        }
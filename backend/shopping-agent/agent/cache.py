@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain.messages import AnyMessage, AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+def normalize_messages(messages: List[AnyMessage]) -> list:
+    """
+    Reduce a conversation to what actually determines the model's answer.
+    Whitespace and casing of user text are folded, and tool call ids (random
+    per run) are replaced by their position in the conversation.
+    """
+    call_ids = {}
+    normalized = []
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        content = " ".join(content.split())
+        if isinstance(message, HumanMessage):
+            normalized.append(["human", content.casefold()])
+        elif isinstance(message, AIMessage):
+            calls = []
+            for call in message.tool_calls:
+                call_ids[call["id"]] = f"call_{len(call_ids)}"
+                calls.append([call["name"], call["args"]])
+            normalized.append(["ai", content, calls])
+        elif isinstance(message, ToolMessage):
+            normalized.append(["tool", call_ids.get(message.tool_call_id, ""), content])
+        else:
+            normalized.append([message.type, content])
+    return normalized
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + optional directory of JSON files) cache of final
+    model responses. Entries expire after their TTL and are only served for
+    the catalog version they were produced against.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(system_prompt: str, tools_fingerprint: str, messages: List[AnyMessage]) -> str:
+        payload = json.dumps(
+            [system_prompt, tools_fingerprint, normalize_messages(messages)],
+            sort_keys=True, separators=(",", ":"), default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, catalog_version=None) -> Optional[AIMessage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None:
+            return None
+        if entry["expires_at"] < time.time() or entry["catalog_version"] != catalog_version:
+            self.discard(key)
+            return None
+        return messages_from_dict([entry["message"]])[0]
+
+    def put(self, key: str, message: AIMessage, catalog_version=None, ttl: Optional[float] = None) -> None:
+        entry = {
+            "expires_at": time.time() + (self.ttl if ttl is None else ttl),
+            "catalog_version": catalog_version,
+            "message": message_to_dict(message),
+        }
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[dict]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: dict) -> None:
+        if not self.directory:
+            return
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, self._path(key))
@@ -0,0 +1,174 @@
+import zlib
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+EMPTY_CHAIN = b""
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def _is_message_list(obj: Any) -> bool:
+    return isinstance(obj, list) and bool(obj) and all(isinstance(m, BaseMessage) for m in obj)
+
+class CompactSerializer(SerializerProtocol):
+    """
+    Checkpoint serializer for MemorySaver that stores each message once.
+
+    MemorySaver writes the whole `messages` channel on every step, so a thread
+    with n messages holds O(n^2) message copies. Here every message is stored
+    once, keyed by its content hash, and a message list is encoded as the head
+    of a hash chain (head = hash(previous head + message hash)). Appending a
+    message adds one chain node, so each checkpoint is a delta against its
+    parent, and threads with the same prefix share nodes.
+
+    Large string contents (tool outputs such as search listings) are stored
+    separately, also by hash, so identical results are kept once across
+    threads. Everything else goes through the regular msgpack serializer and
+    is zlib-compressed above `compress_over` bytes.
+
+    Shared entries are not reference counted: `sweep(saver)` drops whatever
+    the saver's checkpoints and pending writes no longer reach (see
+    CompactMemorySaver, which sweeps on delete_thread). A chain is only
+    reachable once the saver has stored its head, so saves must hold `lock`
+    from serializing to storing for a sweep to be safe.
+    """
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None, compress_over: int = 512, share_over: int = 256):
+        self.inner = inner or JsonPlusSerializer()
+        self.compress_over = compress_over
+        self.share_over = share_over
+        # digest -> compressed content / (encoded message, content digest); chain node -> (previous node, message digest)
+        self.contents: Dict[bytes, bytes] = {}
+        self.messages: Dict[bytes, Tuple[str, bytes, Optional[bytes]]] = {}
+        self.chains: Dict[bytes, Tuple[bytes, bytes]] = {}
+        self.lock = threading.RLock()
+
+    # Generic values
+    def _pack(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) > self.compress_over:
+            return f"zlib+{type_}", zlib.compress(data)
+        return type_, data
+
+    def _unpack(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.startswith("zlib+"):
+            return self.inner.loads_typed((type_[5:], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+    # Messages
+    def _put_message(self, message: BaseMessage) -> bytes:
+        content_ref = None
+        if isinstance(message.content, str) and len(message.content) > self.share_over:
+            raw = message.content.encode("utf-8")
+            content_ref = _digest(raw)
+            if content_ref not in self.contents:
+                self.contents[content_ref] = zlib.compress(raw)
+            message = message.model_copy(update={"content": ""})
+
+        type_, data = self._pack([message, content_ref])
+        key = _digest(type_.encode("utf-8") + data)
+        self.messages.setdefault(key, (type_, data, content_ref))
+        return key
+
+    def _get_message(self, key: bytes) -> BaseMessage:
+        message, content_ref = self._unpack(self.messages[key][:2])
+        if content_ref is not None:
+            message = message.model_copy(update={"content": zlib.decompress(self.contents[content_ref]).decode("utf-8")})
+        return message
+
+    def _put_chain(self, messages: List[BaseMessage]) -> bytes:
+        head = EMPTY_CHAIN
+        for message in messages:
+            key = self._put_message(message)
+            node = _digest(head + key)
+            self.chains.setdefault(node, (head, key))
+            head = node
+        return head
+
+    def _get_chain(self, head: bytes) -> List[BaseMessage]:
+        keys = []
+        while head != EMPTY_CHAIN:
+            head, key = self.chains[head]
+            keys.append(key)
+        return [self._get_message(key) for key in reversed(keys)]
+
+    # SerializerProtocol
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if _is_message_list(obj):
+            with self.lock:
+                return "msgchain", self._put_chain(obj)
+        return self._pack(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        if data[0] == "msgchain":
+            return self._get_chain(data[1])
+        return self._unpack(data)
+
+    def sweep(self, saver: MemorySaver) -> int:
+        """
+        Drop chain nodes, messages and contents that no checkpoint or pending
+        write in `saver` refers to. Returns the number of chain nodes dropped.
+        """
+        with self.lock:
+            heads = set()
+            for type_, data in saver.blobs.values():
+                if type_ == "msgchain":
+                    heads.add(data)
+            for writes in saver.writes.values():
+                for _, _, (type_, data), _ in writes.values():
+                    if type_ == "msgchain":
+                        heads.add(data)
+
+            live_nodes, live_messages = set(), set()
+            for node in heads:
+                while node != EMPTY_CHAIN and node not in live_nodes:
+                    live_nodes.add(node)
+                    node, key = self.chains[node]
+                    live_messages.add(key)
+            live_contents = {self.messages[key][2] for key in live_messages}
+
+            dropped = len(self.chains) - len(live_nodes)
+            self.chains = {node: self.chains[node] for node in live_nodes}
+            self.messages = {key: self.messages[key] for key in live_messages}
+            self.contents = {ref: data for ref, data in self.contents.items() if ref in live_contents}
+        return dropped
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self.messages),
+            "message_bytes": sum(len(d) for _, d, _ in self.messages.values()),
+            "contents": len(self.contents),
+            "content_bytes": sum(len(c) for c in self.contents.values()),
+            "chain_nodes": len(self.chains),
+        }
+
+
+class CompactMemorySaver(MemorySaver):
+    """
+    MemorySaver with a CompactSerializer whose shared storage is reclaimed
+    when a thread is deleted. Saves hold the serializer's lock, so a sweep
+    never sees a chain that is serialized but not yet stored.
+    """
+
+    def __init__(self, serde: Optional[CompactSerializer] = None):
+        super().__init__(serde=serde or CompactSerializer())
+
+    def put(self, *args, **kwargs):
+        with self.serde.lock:
+            return super().put(*args, **kwargs)
+
+    def put_writes(self, *args, **kwargs):
+        with self.serde.lock:
+            return super().put_writes(*args, **kwargs)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.serde.lock:
+            super().delete_thread(thread_id)
+            self.serde.sweep(self)
@@ -0,0 +1,51 @@
+import re
+from typing import NamedTuple, Optional
+
+class Intent(NamedTuple):
+    tool: str
+    args: dict
+
+_UUID = r"(?P<{name}>[0-9a-f]{{8}}-[0-9a-f]{{4}}-[0-9a-f]{{4}}-[0-9a-f]{{4}}-[0-9a-f]{{12}})"
+
+# Each pattern must match the WHOLE normalized message, so anything with extra
+# qualifiers ("show my cart and remove the hat") falls through to the LLM.
+INTENT_PATTERNS = [
+    ("view_cart", re.compile(
+        r"(?:(?:show|view|see|display|open|check)(?: me)? )?(?:my |the )?(?:shopping )?(?:cart|basket)"
+        r"|what(?:'s| is) in (?:my |the )?(?:cart|basket)"
+    )),
+    ("list_categories", re.compile(
+        r"(?:(?:list|show|view|see|display)(?: me)?(?: all)?(?: the)? |what(?: are| categories are)?(?: all)?(?: the)? )?"
+        r"(?:product |available )?categories(?: (?:are there|do you have|are available))?"
+    )),
+    ("pay", re.compile(
+        r"pay(?: for)?(?: (?:my |the ))?(?: order)?(?: id)? " + _UUID.format(name="order_id")
+    )),
+    ("get_product_details", re.compile(
+        r"(?:show|view|get|see)(?: me)?(?: the)?(?: product)?(?: details| info)?(?: for| of)?(?: product)? "
+        + _UUID.format(name="product_id")
+    )),
+]
+
+_POLITE_PREFIX = re.compile(r"^(?:please |can you |could you |would you )+")
+_POLITE_SUFFIX = re.compile(r"(?: please| thanks| thank you)+$")
+
+def normalize(text: str) -> str:
+    text = " ".join(text.lower().split())
+    text = text.strip(" .!?")
+    text = _POLITE_PREFIX.sub("", text)
+    return _POLITE_SUFFIX.sub("", text).strip(" ,.!?")
+
+def match_intent(text: str) -> Optional[Intent]:
+    """
+    Match a user message against the simple deterministic commands.
+    Returns None unless the message is unambiguously one of them.
+    """
+    if not isinstance(text, str):
+        return None
+    normalized = normalize(text)
+    for tool_name, pattern in INTENT_PATTERNS:
+        match = pattern.fullmatch(normalized)
+        if match:
+            return Intent(tool_name, match.groupdict())
+    return None
@@ -0,0 +1,103 @@
+import re
+import json
+import time
+from uuid import uuid4
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+CART_ITEM_RE = re.compile(r"Cart Item ID: (" + UUID_RE.pattern + ")", re.IGNORECASE)
+FILLER_WORDS = {
+    "find", "search", "show", "me", "for", "some", "a", "an", "the", "i", "want", "need", "looking",
+    "please", "can", "you", "get", "buy", "any", "do", "have", "under", "cheap", "good", "best",
+}
+SUMMARY_LINES = 5
+
+class LocalChatModel(BaseChatModel):
+    """
+    Offline stand-in for the chat model, for batch runs and evaluation.
+
+    Picks a tool from keywords in the last user message, answers with a short
+    summary once the tool result is in, and streams tool calls and text in
+    chunks the way the real model does. `latency` (seconds) is slept before
+    each reply to simulate model time.
+    """
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-stand-in"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool choice is rule-based; the schemas are not needed
+        return self
+
+    def _decide(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        request = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        text = request.lower()
+
+        if isinstance(last, HumanMessage):
+            ids = UUID_RE.findall(request)
+            if ids and "pay" in text:
+                return self._call("pay", {"order_id": ids[0]})
+            if ids and "similar" in text:
+                return self._call("find_similar_products", {"product_id": ids[0]})
+            if ids and "add" in text:
+                quantity = re.search(r"\b(\d+)\b", UUID_RE.sub("", text))
+                return self._call("add_to_cart", {"product_id": ids[0], "quantity": int(quantity.group(1)) if quantity else 1})
+            if ids:
+                return self._call("get_product_details", {"product_id": ids[0]})
+            if "checkout" in text or "cart" in text:
+                return self._call("view_cart", {})
+            if "categor" in text:
+                return self._call("list_categories", {})
+            terms = [w for w in re.findall(r"[a-z0-9]+", text) if w not in FILLER_WORDS]
+            return self._call("search_products", {"q": " ".join(terms) or text})
+
+        if isinstance(last, ToolMessage):
+            # Checkout is two steps: read the cart, then order everything in it
+            cart_items = CART_ITEM_RE.findall(last.content)
+            if "checkout" in text and cart_items:
+                return self._call("checkout", {"cart_item_ids": cart_items})
+            lines = last.content.splitlines()
+            summary = "\n".join(lines[:SUMMARY_LINES])
+            more = f"\n(and {len(lines) - SUMMARY_LINES} more)" if len(lines) > SUMMARY_LINES else ""
+            return AIMessage(content=f"Here is what I found:\n{summary}{more}")
+
+        return AIMessage(content="How can I help you shop today?")
+
+    @staticmethod
+    def _call(name: str, args: dict) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid4().hex[:24]}"}])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._decide(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._decide(messages)
+
+        chunks = []
+        for index, call in enumerate(message.tool_calls):
+            # Arguments arrive in two pieces, like a streamed function call
+            raw = json.dumps(call["args"])
+            half = len(raw) // 2
+            chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": raw[:half], "id": call["id"], "index": index}]))
+            chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+                {"name": None, "args": raw[half:], "id": None, "index": index}]))
+        for line in message.content.splitlines(keepends=True):
+            chunks.append(AIMessageChunk(content=line))
+
+        for chunk in chunks:
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
@@ -6,6 +6,11 @@ from .tools import TOOLS
 load_dotenv()
 
 def get_model():
+    # AGENT_MODEL=local swaps in a rule-based offline model (batch runs, evaluation)
+    if os.getenv("AGENT_MODEL", "azure") == "local":
+        from .local_model import LocalChatModel
+        return LocalChatModel(latency=float(os.getenv("AGENT_LOCAL_MODEL_LATENCY_MS", "0")) / 1000).bind_tools(TOOLS)
+
     model = init_chat_model(
         "azure_openai:gpt-4.0",
         azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
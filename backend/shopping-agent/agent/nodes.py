@@ -1,41 +1,121 @@
-from langchain.messages import SystemMessage, ToolMessage
+import os
+import json
+from uuid import uuid4
+from langchain.messages import SystemMessage, ToolMessage, AIMessage, HumanMessage
+from langchain_core.callbacks import dispatch_custom_event
+from langchain_core.messages import message_chunk_to_message
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langgraph.graph import END
 from typing import Literal
 
 from .state import MessagesState
-from .tools import TOOLS
+from .tools import TOOLS, READ_ONLY_TOOLS, catalog_version
 from .model import get_model
-from .prompts import SYSTEM_PROMPT
+from .prompts import SYSTEM_PROMPT, FAST_PATH_TEMPLATES
+from .intents import match_intent
+from .speculation import SpeculativeToolRunner
+from .cache import ResponseCache
 
 # Initialize model and tools
 model_with_tools = get_model()
 tools_by_name = {tool.name: tool for tool in TOOLS}
+FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH", "1") == "1"
+SPECULATION_ENABLED = os.getenv("AGENT_SPECULATIVE_TOOLS", "1") == "1"
+speculator = SpeculativeToolRunner(tools_by_name, READ_ONLY_TOOLS)
 
-def llm_call(state: MessagesState):
+# Opt-in cache of model turns: AGENT_LLM_CACHE=1, optionally AGENT_LLM_CACHE_DIR for the disk tier
+response_cache = ResponseCache(
+    ttl=float(os.getenv("AGENT_LLM_CACHE_TTL", "3600")),
+    directory=os.getenv("AGENT_LLM_CACHE_DIR"),
+) if os.getenv("AGENT_LLM_CACHE", "0") == "1" else None
+TOOLS_FINGERPRINT = json.dumps([convert_to_openai_tool(tool) for tool in TOOLS], sort_keys=True)
+
+def router(state: MessagesState):
     """
-    LLM decides whether to call a tool or not.
-    Provides reasoning and context for the agent.
+    Answer simple deterministic commands ("show my cart", "list categories")
+    straight from the matching tool, skipping the LLM entirely.
     """
+    last_message = state["messages"][-1] if state["messages"] else None
+    if not FAST_PATH_ENABLED or not isinstance(last_message, HumanMessage):
+        return {}
+
+    intent = match_intent(last_message.content)
+    if intent is None:
+        return {}
+
+    tool_call_id = f"fast_{uuid4().hex}"
+    obs = tools_by_name[intent.tool].invoke(intent.args)
+    response = FAST_PATH_TEMPLATES[intent.tool].format(result=obs)
+    # Streaming clients only see model tokens, so surface the reply explicitly
+    dispatch_custom_event("response_text", {"content": response})
+
     return {
         "messages": [
-            model_with_tools.invoke(
-                [SystemMessage(content=SYSTEM_PROMPT)] + state["messages"]
-            )
+            AIMessage(content="", tool_calls=[{"name": intent.tool, "args": intent.args, "id": tool_call_id}]),
+            ToolMessage(content=str(obs), tool_call_id=tool_call_id),
+            AIMessage(content=response),
         ]
     }
 
+
+def replay_cached(message: AIMessage) -> AIMessage:
+    """
+    Emit a cached response to streaming clients in one go and give its tool
+    calls fresh ids, since ids must stay unique within a thread.
+    """
+    if message.content:
+        dispatch_custom_event("response_text", {"content": message.content})
+    return AIMessage(
+        content=message.content,
+        tool_calls=[{**call, "id": f"call_{uuid4().hex}"} for call in message.tool_calls],
+    )
+
+def llm_call(state: MessagesState):
+    """
+    LLM decides whether to call a tool or not.
+    Provides reasoning and context for the agent.
+    Read-only tool calls start running as soon as their arguments are streamed.
+    """
+    cache_key = None
+    if response_cache is not None:
+        cache_key = ResponseCache.make_key(SYSTEM_PROMPT, TOOLS_FINGERPRINT, state["messages"])
+        cached = response_cache.get(cache_key, catalog_version())
+        if cached is not None:
+            return {"messages": [replay_cached(cached)]}
+
+    message = None
+    for chunk in model_with_tools.stream(
+        [SystemMessage(content=SYSTEM_PROMPT)] + state["messages"]
+    ):
+        message = chunk if message is None else message + chunk
+        if SPECULATION_ENABLED:
+            speculator.observe(message)
+
+    message = message_chunk_to_message(message)
+    if cache_key is not None:
+        response_cache.put(cache_key, message, catalog_version())
+    return {"messages": [message]}
+
 def tool_node(state: MessagesState):
     """
     Execute tools immediately without requiring human approval.
+    Results already produced speculatively during llm_call are reused, unless
+    a mutating call earlier in the message has run since they were computed.
     """
     result = []
     last_message = state["messages"][-1]
+    mutated = False
 
     for tool_call in getattr(last_message, "tool_calls", []):
         tool_name = tool_call["name"]
         if tool_name in tools_by_name:
+            tool = tools_by_name[tool_name]
+            speculated = speculator.claim(tool_call["id"], tool_name, tool_call["args"])
+            if speculated is not None and not mutated:
+                tool = speculator.replay(tool_name, speculated)
+            mutated = mutated or tool_name not in READ_ONLY_TOOLS
             # Execute all tools immediately
-            obs = tools_by_name[tool_name].invoke(tool_call["args"])
+            obs = tool.invoke(tool_call["args"])
             result.append(ToolMessage(content=str(obs), tool_call_id=tool_call["id"]))
         else:
             result.append(ToolMessage(content=f"Error: Tool {tool_name} not found.", tool_call_id=tool_call["id"]))
@@ -51,3 +131,12 @@ def should_continue(state: MessagesState) -> Literal["tool_node", END]:
     if getattr(last_message, "tool_calls", None):
         return "tool_node"
     return END
+
+def route_intent(state: MessagesState) -> Literal["llm_call", END]:
+    """
+    Finish the turn if the router already answered it, otherwise ask the LLM.
+    """
+    last_message = state["messages"][-1] if state["messages"] else None
+    if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        return END
+    return "llm_call"
@@ -21,3 +21,11 @@ CRITICAL REASONING RULES:
 4. Then, call the tool.
 5. After getting tool results, explain what the results mean and what you'll do next.
 The user wants to see your 'stream of consciousness' so they can follow your logic."""
+
+# Responses for the LLM-free fast path, keyed by tool name.
+FAST_PATH_TEMPLATES = {
+    "view_cart": "Here's what's currently in your cart:\n\n{result}",
+    "list_categories": "{result}\n\nLet me know which category you'd like to browse!",
+    "pay": "{result}",
+    "get_product_details": "Here are the product details:\n\n{result}",
+}
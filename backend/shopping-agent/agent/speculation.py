@@ -0,0 +1,75 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
+
+from langchain_core.tools import StructuredTool
+
+class SpeculativeToolRunner:
+    """
+    Starts read-only tool calls while the model is still streaming.
+
+    `observe` is fed the partial message after every chunk; as soon as a tool
+    call's arguments form a complete JSON object, the call is submitted to a
+    small thread pool. `tool_node` later claims the result by tool_call_id and
+    only falls back to a normal invocation when nothing was speculated.
+
+    Calls are only speculated up to the first one that is not read-only (or
+    whose name has not streamed yet): anything after a mutating call has to
+    see its effect, so it waits for `tool_node` to run the calls in order.
+    """
+
+    def __init__(self, tools_by_name: dict, allowed: set, max_workers: int = 4, max_pending: int = 256):
+        self.tools_by_name = tools_by_name
+        self.allowed = allowed
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-tool")
+        self._pending: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, message) -> None:
+        chunks = getattr(message, "tool_call_chunks", None) or []
+        for chunk in sorted(chunks, key=lambda c: c.get("index") or 0):
+            call_id, name, raw_args = chunk.get("id"), chunk.get("name"), chunk.get("args") or ""
+            if name not in self.allowed:
+                break
+            if not call_id or not raw_args.rstrip().endswith("}"):
+                continue
+            with self._lock:
+                if call_id in self._pending:
+                    continue
+            try:
+                args = json.loads(raw_args)
+            except ValueError:
+                continue  # still streaming
+            if isinstance(args, dict):
+                self._submit(call_id, name, args)
+
+    def _submit(self, call_id: str, name: str, args: dict) -> None:
+        future = self._pool.submit(self.tools_by_name[name].invoke, args)
+        with self._lock:
+            self._pending[call_id] = (name, args, future)
+            # Drop results nobody claimed (e.g. the run was cancelled)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+    def claim(self, call_id: str, name: str, args: dict) -> Optional[Future]:
+        with self._lock:
+            entry = self._pending.pop(call_id, None)
+        if entry is None or entry[0] != name or entry[1] != args:
+            return None
+        return entry[2]
+
+    def replay(self, name: str, future: Future) -> StructuredTool:
+        """
+        Wrap a speculated result as a tool so invoking it still emits the usual
+        tool start/end callbacks for streaming clients.
+        """
+        tool = self.tools_by_name[name]
+        return StructuredTool.from_function(
+            func=lambda **_: future.result(),
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+        )
@@ -1,5 +1,9 @@
 import os
+import time
+import hashlib
+import threading
 import requests
+from collections import OrderedDict
 from typing import List, Optional
 from langchain.tools import tool
 from dotenv import load_dotenv
@@ -7,6 +11,73 @@ from dotenv import load_dotenv
 load_dotenv()
 BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 
+# Catalog version reported by the backend, used to invalidate cached LLM turns.
+# Refreshed by every catalog response and, when older than CATALOG_VERSION_TTL
+# seconds, by a conditional GET before it is used.
+CATALOG_VERSION_TTL = float(os.getenv("AGENT_CATALOG_VERSION_TTL", "2"))
+_catalog_version = None
+_catalog_version_at = 0.0
+_catalog_version_lock = threading.Lock()
+
+def _track_catalog_version(resp):
+    global _catalog_version, _catalog_version_at
+    version = resp.headers.get("X-Catalog-Version")
+    if version is not None:
+        _catalog_version, _catalog_version_at = version, time.monotonic()
+
+def catalog_version():
+    """
+    The backend's current catalog version, at most CATALOG_VERSION_TTL seconds old.
+    Falls back to the last known version if the backend cannot be reached.
+    """
+    with _catalog_version_lock:
+        if _catalog_version is None or time.monotonic() - _catalog_version_at > CATALOG_VERSION_TTL:
+            try:
+                # Usually a 304: the categories ETag is the catalog version
+                _get_catalog("/products/categories")
+            except Exception:
+                pass
+    return _catalog_version
+
+# Catalog responses kept with their ETag so repeat lookups are revalidated, not re-downloaded
+_session = requests.Session()
+_etag_cache = OrderedDict()
+_etag_lock = threading.Lock()
+ETAG_CACHE_SIZE = 256
+
+def _get_catalog(path: str, params: Optional[dict] = None):
+    """
+    GET a catalog endpoint with If-None-Match, reusing the cached body on 304.
+    """
+    params = {k: v for k, v in (params or {}).items() if v is not None}
+    key = (path, tuple(sorted(params.items())))
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+
+    resp = _session.get(f"{BASE_URL}{path}", params=params, headers=headers)
+    _track_catalog_version(resp)
+    if resp.status_code == 304 and cached:
+        return cached[1]
+    resp.raise_for_status()
+    data = resp.json()
+
+    etag = resp.headers.get("ETag")
+    if etag:
+        with _etag_lock:
+            _etag_cache[key] = (etag, data)
+            _etag_cache.move_to_end(key)
+            while len(_etag_cache) > ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return data
+
+def _idempotency_key(*parts: str) -> dict:
+    """
+    Idempotency-Key header derived from the call's arguments, so a retried tool
+    call or a re-run graph step replays the first result instead of repeating it.
+    """
+    return {"Idempotency-Key": hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()}
+
 @tool
 def search_products(
     q: Optional[str] = None,
@@ -17,22 +88,14 @@ def search_products(
     """
     Search for products in the store.
     You can filter by a search query (q), category, and price range (in cents).
-    NOTE: If searching for a plural term (e.g., 'phones') returns nothing, try the singular ('phone').
+    The query tolerates plurals and small typos.
     """
     try:
         params = {"q": q, "category": category, "min_price": min_price, "max_price": max_price}
-        resp = requests.get(f"{BASE_URL}/products/search", params=params)
-        resp.raise_for_status()
-        products = resp.json()
-
-        # Try singular if plural yields no results
-        if not products and q and q.endswith('s'):
-            resp = requests.get(f"{BASE_URL}/products/search", params={**params, "q": q[:-1]})
-            resp.raise_for_status()
-            products = resp.json()
+        products = _get_catalog("/products/search", params)
 
         if not products:
-            return "No products found. Try a broader search or singular terms."
+            return "No products found. Try a broader search."
 
         return "\n".join(
             f"- {p['name']} (ID: {p['id']}) | Price: ${p['price']/100:.2f} | Category: {p['category']} | Image: {p['image_url']}"
@@ -49,9 +112,7 @@ def get_product_details(product_id: str) -> str:
     Returns name, description, price, category, stock quantity, and rating info.
     """
     try:
-        resp = requests.get(f"{BASE_URL}/products/{product_id}")
-        resp.raise_for_status()
-        p = resp.json()
+        p = _get_catalog(f"/products/{product_id}")
         return (
             f"Name: {p['name']}\n"
             f"ID: {p['id']}\n"
@@ -66,6 +127,24 @@ def get_product_details(product_id: str) -> str:
         return f"Error getting product details: {str(e)}"
 
 
+@tool
+def find_similar_products(product_id: str, k: int = 5) -> str:
+    """
+    Find products similar to the given product (same kind of item, close in price and rating).
+    Use this to suggest alternatives instead of running another search.
+    """
+    try:
+        products = _get_catalog(f"/products/{product_id}/similar", {"k": k})
+        if not products:
+            return "No similar products found."
+        return "\n".join(
+            f"- {p['name']} (ID: {p['id']}) | Price: ${p['price']/100:.2f} | Category: {p['category']} | Rating: {p['rating']} | Image: {p['image_url']}"
+            for p in products
+        )
+    except Exception as e:
+        return f"Error finding similar products: {str(e)}"
+
+
 @tool
 def add_to_cart(product_id: str, quantity: int = 1) -> str:
     """
@@ -112,7 +191,13 @@ def checkout(cart_item_ids: List[str]) -> str:
     Returns the order ID and total amount.
     """
     try:
-        resp = requests.post(f"{BASE_URL}/orders", json={"cart_item_ids": cart_item_ids})
+        # Sorted, so the same cart maps to the same key and request body in any order
+        cart_item_ids = sorted(cart_item_ids)
+        resp = requests.post(
+            f"{BASE_URL}/orders",
+            json={"cart_item_ids": cart_item_ids},
+            headers=_idempotency_key("checkout", *cart_item_ids),
+        )
         resp.raise_for_status()
         order = resp.json()
         return f"Order created successfully! Order ID: {order['id']} | Total: ${order['total_amount']/100:.2f}"
@@ -126,9 +211,7 @@ def list_categories() -> str:
     Get a list of all available product categories.
     """
     try:
-        resp = requests.get(f"{BASE_URL}/products/categories")
-        resp.raise_for_status()
-        return "Available categories: " + ", ".join(resp.json())
+        return "Available categories: " + ", ".join(_get_catalog("/products/categories"))
     except Exception as e:
         return f"Error listing categories: {str(e)}"
 
@@ -140,14 +223,25 @@ def pay(order_id: str) -> str:
     Returns transaction ID if successful.
     """
     try:
-        intent_resp = requests.post(f"{BASE_URL}/payments/create-intent", json={"order_id": order_id})
+        intent_resp = requests.post(
+            f"{BASE_URL}/payments/create-intent",
+            json={"order_id": order_id},
+            headers=_idempotency_key("pay", order_id),
+        )
         intent_resp.raise_for_status()
         payment_id = intent_resp.json()["id"]
 
-        confirm_resp = requests.post(f"{BASE_URL}/payments/confirm", json={"payment_id": payment_id})
+        confirm_resp = requests.post(
+            f"{BASE_URL}/payments/confirm",
+            json={"payment_id": payment_id},
+            headers=_idempotency_key("confirm", payment_id),
+        )
         confirm_resp.raise_for_status()
         return f"Payment successful for Order {order_id}! Transaction ID: {payment_id}"
     except Exception as e:
         return f"Payment failed: {str(e)}"
 
-TOOLS = [search_products, get_product_details, add_to_cart, view_cart, checkout, list_categories, pay]
+TOOLS = [search_products, get_product_details, find_similar_products, add_to_cart, view_cart, checkout, list_categories, pay]
+
+# Tools without side effects; safe to run speculatively or more than once.
+READ_ONLY_TOOLS = {"search_products", "get_product_details", "find_similar_products", "view_cart", "list_categories"}
@@ -1,13 +1,18 @@
 import os
+import sys
+import json
+import time
 import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain.messages import HumanMessage
+from langchain.messages import AIMessage, HumanMessage, ToolMessage
 from agent import agent
 
 load_dotenv()
 BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 
-async def main():
+async def interactive():
     print("--- Shopping Assistant Agent ---")
     print(f"Backend: {BASE_URL}")
     print("Type 'exit' or 'quit' to end.\n")
@@ -34,6 +39,8 @@ async def main():
                 content = event["data"]["chunk"].content
                 if content:
                     print(content, end="", flush=True)
+            elif kind == "on_custom_event" and event["name"] == "response_text":
+                print(event["data"]["content"], end="", flush=True)
             elif kind == "on_tool_start":
                 print(f"\n  [Tool Start: {event['name']}({event['data'].get('input')})]")
             elif kind == "on_tool_end":
@@ -44,8 +51,122 @@ async def main():
 
         print()  # New line
 
+# -----------------------------
+# Batch Replay
+# -----------------------------
+async def run_turn(text: str, config: dict) -> dict:
+    """
+    Run one user turn; returns the new messages as a transcript plus timings.
+    LLM and tool time are summed over their runs (they can overlap when tool
+    calls are speculated).
+    """
+    before = len((await agent.aget_state(config)).values.get("messages", []))
+    started = {}
+    llm_s = tool_s = 0.0
+    llm_calls = tool_calls = 0
+
+    t0 = time.perf_counter()
+    async for event in agent.astream_events({"messages": [HumanMessage(content=text)]}, config, version="v2"):
+        kind = event["event"]
+        if kind in ("on_chat_model_start", "on_tool_start"):
+            started[event["run_id"]] = time.perf_counter()
+        elif kind == "on_chat_model_end":
+            llm_s += time.perf_counter() - started.pop(event["run_id"], t0)
+            llm_calls += 1
+        elif kind == "on_tool_end":
+            tool_s += time.perf_counter() - started.pop(event["run_id"], t0)
+            tool_calls += 1
+    total_s = time.perf_counter() - t0
+
+    transcript = []
+    for message in (await agent.aget_state(config)).values["messages"][before + 1:]:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            transcript.extend({"role": "tool_call", "name": c["name"], "args": c["args"]} for c in message.tool_calls)
+        elif isinstance(message, ToolMessage):
+            transcript.append({"role": "tool", "content": message.content})
+        elif isinstance(message, AIMessage):
+            transcript.append({"role": "assistant", "content": message.content})
+
+    return {
+        "input": text,
+        "output": next((m["content"] for m in reversed(transcript) if m["role"] == "assistant"), ""),
+        "transcript": transcript,
+        "timings": {
+            "llm_ms": round(llm_s * 1000, 2),
+            "tool_ms": round(tool_s * 1000, 2),
+            "total_ms": round(total_s * 1000, 2),
+            "llm_calls": llm_calls,
+            "tool_calls": tool_calls,
+        },
+    }
+
+async def run_conversation(index: int, conversation: dict) -> dict:
+    conversation_id = str(conversation.get("id", index))
+    config = {"configurable": {"thread_id": f"batch-{conversation_id}"}}
+    result = {"id": conversation_id, "thread_id": config["configurable"]["thread_id"], "turns": []}
+    try:
+        for text in conversation["turns"]:
+            result["turns"].append(await run_turn(text, config))
+    except Exception as e:
+        result["error"] = repr(e)
+    return result
+
+async def batch(path: str, output: str, workers: int):
+    """
+    Replay scripted conversations from a JSONL file ({"id": ..., "turns": [...]}
+    per line), `workers` at a time, each on its own thread_id. Results are
+    written as JSONL in completion order.
+    """
+    with open(path) as f:
+        conversations = [json.loads(line) for line in f if line.strip()]
+
+    # Graph nodes are sync and run on the loop's default executor, which is sized
+    # by CPU count; give each worker its own threads so model waits overlap
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers * 2))
+
+    queue = asyncio.Queue()
+    for item in enumerate(conversations):
+        queue.put_nowait(item)
+    out = open(output, "w") if output != "-" else sys.stdout
+    turn_ms, failed = [], 0
+
+    async def worker():
+        nonlocal failed
+        while not queue.empty():
+            index, conversation = queue.get_nowait()
+            result = await run_conversation(index, conversation)
+            failed += "error" in result
+            turn_ms.extend(t["timings"]["total_ms"] for t in result["turns"])
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    turn_ms.sort()
+    p = lambda q: turn_ms[min(int(len(turn_ms) * q), len(turn_ms) - 1)] if turn_ms else 0.0
+    print(
+        f"{len(conversations)} conversations ({failed} failed), {len(turn_ms)} turns in {elapsed:.2f}s "
+        f"= {len(turn_ms) / elapsed:.1f} turns/s | turn p50={p(0.5):.1f}ms p95={p(0.95):.1f}ms",
+        file=sys.stderr,
+    )
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shopping assistant CLI")
+    parser.add_argument("--batch", help="JSONL file of scripted conversations to replay instead of chatting")
+    parser.add_argument("--output", default="-", help="where to write batch results as JSONL (default: stdout)")
+    parser.add_argument("--workers", type=int, default=8, help="conversations replayed concurrently")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main())
+        if args.batch:
+            asyncio.run(batch(args.batch, args.output, args.workers))
+        else:
+            asyncio.run(interactive())
     except KeyboardInterrupt:
         pass
@@ -1,20 +1,23 @@
 import os
-import json
 import uvicorn
 from typing import List, Optional
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from langchain.messages import HumanMessage, AIMessage, SystemMessage
 from langgraph.types import Command
 from dotenv import load_dotenv
 
 from agent import agent
+from streaming import coalesced_stream, negotiate_encoding
+from admission import AdmissionController, AdmissionRejected, classify_priority
 
 load_dotenv()
 
 app = FastAPI(title="Shopping Agent Streaming API")
+admission = AdmissionController()
 
 # Enable CORS
 app.add_middleware(
@@ -45,39 +48,59 @@ def convert_to_langchain_messages(messages: List[Message]):
             lc_messages.append(SystemMessage(content=msg.content))
     return lc_messages
 
+async def release_when_done(stream, ticket):
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        admission.release(ticket)
+
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
+async def chat_stream(request: ChatRequest, http_request: Request):
     lc_messages = convert_to_langchain_messages(request.messages)
     config = {"configurable": {"thread_id": request.thread_id}}
 
-    async def event_generator():
-        if request.resume_value is not None:
-            # We are resuming after an interrupt
-            input_data = Command(resume=request.resume_value)
-        else:
-            # We are sending a new message
-            # We pass ONLY the latest message to avoid duplication if the thread already exists
-            input_data = {"messages": [lc_messages[-1]]} if lc_messages else {"messages": []}
-        
-        async for event in agent.astream_events(input_data, config, version="v2"):
-            kind = event["event"]
-            
-            # Send events as JSON strings separated by newlines (NDJSON or SSE-like)
-            if kind == "on_chat_model_stream":
-                content = event["data"]["chunk"].content
-                if content:
-                    yield f"data: {json.dumps({'type': 'token', 'content': content})}\n\n"
-            
-            elif kind == "on_tool_start":
-                yield f"data: {json.dumps({'type': 'tool_start', 'name': event['name'], 'input': event['data'].get('input')})}\n\n"
-            
-            elif kind == "on_tool_end":
-                output = event['data'].get('output')
-                yield f"data: {json.dumps({'type': 'tool_end', 'name': event['name'], 'output': str(output)})}\n\n"
-
-        yield "data: [DONE]\n\n"
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    if request.resume_value is not None:
+        # We are resuming after an interrupt
+        input_data = Command(resume=request.resume_value)
+    else:
+        # We are sending a new message
+        # We pass ONLY the latest message to avoid duplication if the thread already exists
+        input_data = {"messages": [lc_messages[-1]]} if lc_messages else {"messages": []}
+
+    # Per-conversation limit: the peer address is shared by everyone behind one NAT or proxy
+    client_id = http_request.headers.get("X-Client-Id") or f"thread:{request.thread_id}"
+    priority = classify_priority(
+        request.messages[-1].content if request.messages else None,
+        resuming=request.resume_value is not None,
+    )
+    try:
+        ticket = await admission.acquire(client_id, priority)
+    except AdmissionRejected as e:
+        raise HTTPException(429, f"Agent is busy ({e.reason}), please retry", headers={"Retry-After": str(int(e.retry_after))})
+
+    try:
+        events = agent.astream_events(input_data, config, version="v2")
+        encoding = negotiate_encoding(http_request.headers.get("accept-encoding"))
+
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        stream = release_when_done(coalesced_stream(events, encoding), ticket)
+        # The generator's finally only runs once it has started; if the client leaves
+        # before the first chunk, the background task hands the slot back (release is idempotent)
+        return StreamingResponse(
+            stream, media_type="text/event-stream", headers=headers,
+            background=BackgroundTask(admission.release, ticket),
+        )
+    except BaseException:
+        admission.release(ticket)
+        raise
+
+@app.get("/metrics/admission")
+def admission_metrics():
+    return admission.snapshot()
 
 if __name__ == "__main__":
     uvicorn.run(
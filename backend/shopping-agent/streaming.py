@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import zlib
+import asyncio
+from typing import AsyncIterator, Optional
+
+# -----------------------------
+# Stream Settings
+# -----------------------------
+# Buffered tokens are flushed as one SSE frame once either limit is reached.
+# Setting STREAM_FLUSH_MS=0 restores one frame per model chunk.
+FLUSH_MS = float(os.getenv("STREAM_FLUSH_MS", "30"))
+FLUSH_BYTES = int(os.getenv("STREAM_FLUSH_BYTES", "2048"))
+# Frames waiting for a slow client; when full the agent run is paused.
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+# Longest tool output forwarded in a tool_end event.
+TOOL_OUTPUT_MAX_CHARS = int(os.getenv("STREAM_TOOL_OUTPUT_MAX_CHARS", "500"))
+# Comma separated encodings we are willing to use, e.g. "gzip,deflate" or "".
+COMPRESSION = [e.strip() for e in os.getenv("STREAM_COMPRESSION", "gzip,deflate").split(",") if e.strip()]
+
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+_END = object()
+
+
+def sse_frame(payload) -> str:
+    if isinstance(payload, str):
+        return f"data: {payload}\n\n"
+    return f"data: {json.dumps(payload, separators=(',', ':'), default=str)}\n\n"
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the first configured encoding the client accepts, or None.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    for encoding in COMPRESSION:
+        if encoding in accepted and encoding in _WBITS:
+            return encoding
+    return None
+
+
+def tool_output_payload(output) -> dict:
+    """
+    Structured tool_end body: the (possibly truncated) text plus its full length.
+    """
+    text = output.content if hasattr(output, "content") else output
+    if not isinstance(text, str):
+        text = str(text)
+    payload = {"output": text[:TOOL_OUTPUT_MAX_CHARS], "length": len(text)}
+    if len(text) > TOOL_OUTPUT_MAX_CHARS:
+        payload["truncated"] = True
+    return payload
+
+
+def event_payload(event) -> Optional[dict]:
+    """
+    Convert an astream_events (v2) event into the payload sent to the client.
+    Returns None for events the client does not care about.
+    """
+    kind = event["event"]
+
+    if kind == "on_chat_model_stream":
+        content = event["data"]["chunk"].content
+        if content:
+            return {"type": "token", "content": content}
+
+    elif kind == "on_custom_event" and event["name"] == "response_text":
+        return {"type": "token", "content": event["data"]["content"]}
+
+    elif kind == "on_tool_start":
+        return {"type": "tool_start", "name": event["name"], "input": event["data"].get("input")}
+
+    elif kind == "on_tool_end":
+        return {"type": "tool_end", "name": event["name"], **tool_output_payload(event["data"].get("output"))}
+
+    return None
+
+
+class FrameEncoder:
+    """
+    Turns SSE text into the bytes written to the socket, compressing with a
+    sync flush per write so the client can decode every frame as it arrives.
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        self.encoding = encoding
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[encoding]) if encoding else None
+
+    def encode(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if self._compressor is None:
+            return data
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self) -> bytes:
+        if self._compressor is None:
+            return b""
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+async def coalesced_stream(
+    events: AsyncIterator,
+    encoding: Optional[str] = None,
+    flush_ms: float = FLUSH_MS,
+    flush_bytes: int = FLUSH_BYTES,
+    queue_size: int = QUEUE_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Drive `events` in a producer task and yield encoded SSE bytes.
+
+    Consecutive tokens are merged into a single frame until `flush_ms` has
+    passed since the first buffered token or `flush_bytes` is reached; any
+    other event flushes them first. The producer feeds a bounded queue, so a
+    client that stops reading also stops the agent from racing ahead.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    encoder = FrameEncoder(encoding)
+
+    async def produce():
+        try:
+            async for event in events:
+                payload = event_payload(event)
+                if payload is not None:
+                    await queue.put(payload)
+        except Exception as e:
+            await queue.put({"type": "error", "content": str(e)})
+        # Not in `finally`: once cancelled nobody reads the queue, and a full one would block forever
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    tokens: list = []
+    buffered = 0
+    deadline = None
+
+    def flush_tokens() -> str:
+        nonlocal buffered, deadline
+        frame = sse_frame({"type": "token", "content": "".join(tokens)})
+        tokens.clear()
+        buffered = 0
+        deadline = None
+        return frame
+
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield encoder.encode(flush_tokens())
+                continue
+
+            if item is _END:
+                break
+
+            if item["type"] == "token":
+                tokens.append(item["content"])
+                buffered += len(item["content"])
+                if deadline is None:
+                    deadline = time.monotonic() + flush_ms / 1000
+                if buffered >= flush_bytes or flush_ms <= 0:
+                    yield encoder.encode(flush_tokens())
+                continue
+
+            text = flush_tokens() if tokens else ""
+            yield encoder.encode(text + sse_frame(item))
+
+        tail = flush_tokens() if tokens else ""
+        yield encoder.encode(tail + sse_frame("[DONE]")) + encoder.close()
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except asyncio.CancelledError:
+            pass
+        # Close the event stream too, so the agent run stops with the client
+        aclose = getattr(events, "aclose", None)
+        if aclose is not None:
+            await aclose()
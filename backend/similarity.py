@@ -0,0 +1,171 @@
+import math
+import zlib
+import threading
+from typing import Dict, Iterable, List
+from uuid import UUID
+
+import numpy as np
+
+from search import tokenize, stem
+
+# -----------------------------
+# Feature Vectors
+# -----------------------------
+# Categories and name terms are hashed into fixed blocks so new values never
+# change the vector width (and never force a full rebuild).
+CATEGORY_DIMS = 16
+NAME_DIMS = 64
+CATEGORY_WEIGHT = 2.0
+NAME_WEIGHT = 1.5
+PRICE_WEIGHT = 1.0
+RATING_WEIGHT = 0.5
+MAX_PRICE = 200000  # cents; only used to scale log-price into ~[0, 1]
+
+FEATURE_DIMS = CATEGORY_DIMS + NAME_DIMS + 2
+
+def _bucket(value: str, dims: int) -> int:
+    return zlib.crc32(value.encode("utf-8")) % dims
+
+def product_features(product: dict) -> np.ndarray:
+    vector = np.zeros(FEATURE_DIMS, dtype=np.float32)
+    vector[_bucket(product["category"], CATEGORY_DIMS)] = CATEGORY_WEIGHT
+
+    terms = [stem(t) for t in tokenize(product["name"]) if not t.isdigit()]
+    if terms:
+        name = np.zeros(NAME_DIMS, dtype=np.float32)
+        for term in terms:
+            name[_bucket(term, NAME_DIMS)] += 1.0
+        vector[CATEGORY_DIMS:CATEGORY_DIMS + NAME_DIMS] = NAME_WEIGHT * name / np.linalg.norm(name)
+
+    vector[-2] = PRICE_WEIGHT * math.log1p(max(product["price"], 0)) / math.log1p(MAX_PRICE)
+    vector[-1] = RATING_WEIGHT * (product.get("rating", 4.0) - 3.0) / 2.0
+    return vector
+
+# -----------------------------
+# Nearest-Neighbour Index
+# -----------------------------
+class SimilarityIndex:
+    """
+    Keeps the k nearest neighbours (squared Euclidean distance over product
+    features) of every product, so a lookup is a row read.
+
+    The initial build computes distances block by block with matrix products.
+    Each later `add` computes one distance row against the catalog, takes its
+    own top-k from it, and patches only the rows the new product displaces.
+    """
+
+    def __init__(self, k: int = 10, block_size: int = 1024):
+        self.k = k
+        self.block_size = block_size
+        self._slots: Dict[UUID, int] = {}
+        self._ids: List[UUID] = []
+        self._vectors = np.zeros((0, FEATURE_DIMS), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        # Row i holds the neighbours of slot i, nearest first; unused entries are (-1, inf)
+        self._nbr_slots = np.zeros((0, k), dtype=np.int64)
+        self._nbr_dists = np.zeros((0, k), dtype=np.float32)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 64)
+        pad = capacity - len(self._vectors)
+        self._vectors = np.vstack([self._vectors, np.zeros((pad, FEATURE_DIMS), dtype=np.float32)])
+        self._norms = np.concatenate([self._norms, np.zeros(pad, dtype=np.float32)])
+        self._nbr_slots = np.vstack([self._nbr_slots, np.full((pad, self.k), -1, dtype=np.int64)])
+        self._nbr_dists = np.vstack([self._nbr_dists, np.full((pad, self.k), np.inf, dtype=np.float32)])
+
+    def _distances(self, rows: np.ndarray, upto: int) -> np.ndarray:
+        """
+        Squared distances from `rows` to the first `upto` stored vectors.
+        """
+        vectors = self._vectors[:upto]
+        d = self._norms[:upto][None, :] - 2.0 * rows @ vectors.T + np.einsum("ij,ij->i", rows, rows)[:, None]
+        return np.maximum(d, 0.0)
+
+    def _top_k(self, d: np.ndarray):
+        k = min(self.k, d.shape[1])
+        if k == 0:
+            return np.full((len(d), self.k), -1), np.full((len(d), self.k), np.inf, dtype=np.float32)
+        part = np.argpartition(d, k - 1, axis=1)[:, :k]
+        part_d = np.take_along_axis(d, part, axis=1)
+        order = np.argsort(part_d, axis=1)
+        slots = np.full((len(d), self.k), -1, dtype=np.int64)
+        dists = np.full((len(d), self.k), np.inf, dtype=np.float32)
+        slots[:, :k] = np.take_along_axis(part, order, axis=1)
+        dists[:, :k] = np.take_along_axis(part_d, order, axis=1)
+        dists[slots < 0] = np.inf
+        return slots, dists
+
+    def add_many(self, products: Iterable[dict]) -> None:
+        """
+        Bulk build for an empty index; falls back to incremental adds otherwise.
+        """
+        products = [p for p in products if p["id"] not in self._slots]
+        if not products:
+            return
+        if self._size:
+            for product in products:
+                self.add(product)
+            return
+
+        with self._lock:
+            self._grow(len(products))
+            for i, product in enumerate(products):
+                self._slots[product["id"]] = i
+                self._ids.append(product["id"])
+                self._vectors[i] = product_features(product)
+            self._size = len(products)
+            vectors = self._vectors[:self._size]
+            self._norms[:self._size] = np.einsum("ij,ij->i", vectors, vectors)
+
+            for start in range(0, self._size, self.block_size):
+                stop = min(start + self.block_size, self._size)
+                d = self._distances(vectors[start:stop], self._size)
+                d[np.arange(stop - start), np.arange(start, stop)] = np.inf  # not its own neighbour
+                slots, dists = self._top_k(d)
+                slots[np.isinf(dists)] = -1
+                self._nbr_slots[start:stop] = slots
+                self._nbr_dists[start:stop] = dists
+
+    def add(self, product: dict) -> None:
+        with self._lock:
+            if product["id"] in self._slots:
+                return
+            self._grow(1)
+            slot = self._size
+            vector = product_features(product)
+            self._vectors[slot] = vector
+            self._norms[slot] = vector @ vector
+            self._slots[product["id"]] = slot
+            self._ids.append(product["id"])
+
+            d = self._distances(vector[None, :], slot)[0] if slot else np.zeros(0, dtype=np.float32)
+            slots, dists = self._top_k(d[None, :])
+            slots[np.isinf(dists)] = -1
+            self._nbr_slots[slot], self._nbr_dists[slot] = slots[0], dists[0]
+
+            # Existing products whose current k-th neighbour is farther than the new one
+            displaced = np.nonzero(d < self._nbr_dists[:slot, -1])[0]
+            for row in displaced:
+                position = np.searchsorted(self._nbr_dists[row], d[row])
+                self._nbr_slots[row, position + 1:] = self._nbr_slots[row, position:-1].copy()
+                self._nbr_dists[row, position + 1:] = self._nbr_dists[row, position:-1].copy()
+                self._nbr_slots[row, position] = slot
+                self._nbr_dists[row, position] = d[row]
+            self._size += 1
+
+    def similar(self, product_id: UUID, k: int = 5) -> List[UUID]:
+        slot = self._slots.get(product_id)
+        if slot is None:
+            return []
+        with self._lock:
+            row = self._nbr_slots[slot, :k].tolist()
+        return [self._ids[s] for s in row if s >= 0]
@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from starlette.concurrency import run_in_threadpool
+
+from database import products_db, cart_db, orders_db, order_items_db, payments_db
+from orders import OrderBook, encode_segment
+
+# -----------------------------
+# Async Store
+# -----------------------------
+class Store:
+    """
+    Async interface to the in-memory tables, the search catalog and the
+    similarity index.
+
+    Table operations are plain dict reads and writes that run inline on the
+    event loop. Work that can take a while (searching, indexing a new
+    product, anything that waits on shard processes, including get_product
+    with a sharded catalog) is offloaded to the threadpool, where it runs
+    alongside other requests; the catalog and the similarity index lock
+    themselves for that. Chained calls are therefore only atomic up to the
+    first offloaded one: a handler must not assume the tables are unchanged
+    across it.
+
+    With offload=False everything runs inline; that is the mode used when the
+    handlers themselves are dispatched through the threadpool, where only the
+    individual operations are atomic.
+    """
+
+    def __init__(self, catalog, similarity, offload: bool = True):
+        self.catalog = catalog
+        self.similarity = similarity
+        self.offload = offload
+        self.orders = OrderBook(orders_db, order_items_db)
+
+    async def _run(self, fn, *args, **kwargs):
+        if not self.offload:
+            return fn(*args, **kwargs)
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+    # Products
+    async def get_product(self, product_id: UUID) -> Optional[dict]:
+        if self.catalog.blocking:
+            return await self._run(self.catalog.get, product_id)
+        return self.catalog.get(product_id)
+
+    async def active_products(self) -> List[dict]:
+        return [p for p in products_db.values() if p["is_active"]]
+
+    async def categories(self) -> List[str]:
+        return sorted(set(p["category"] for p in products_db.values() if p["is_active"]))
+
+    async def add_product(self, product: dict) -> None:
+        products_db[product["id"]] = product
+        await self._run(self._index_product, product)
+
+    def _index_product(self, product: dict) -> None:
+        self.catalog.add(product)
+        self.similarity.add(product)
+
+    async def search(self, **query):
+        return await self._run(self.catalog.search, **query)
+
+    async def similar(self, product_id: UUID, k: int) -> List[dict]:
+        neighbours = (products_db[pid] for pid in self.similarity.similar(product_id, k))
+        return [p for p in neighbours if p["is_active"]]
+
+    # Cart
+    async def cart_items(self) -> List[dict]:
+        return list(cart_db.values())
+
+    async def get_cart_item(self, item_id: UUID) -> Optional[dict]:
+        return cart_db.get(item_id)
+
+    async def add_cart_item(self, item: dict) -> None:
+        cart_db[item["id"]] = item
+
+    async def update_cart_item(self, item_id: UUID, quantity: int) -> Optional[dict]:
+        item = cart_db.get(item_id)
+        if item is not None:
+            item["quantity"] = quantity
+        return item
+
+    async def remove_cart_items(self, item_ids: Iterable[UUID]) -> List[UUID]:
+        """
+        Remove the given cart items; returns the ids that were actually present.
+        """
+        return [item_id for item_id in item_ids if cart_db.pop(item_id, None) is not None]
+
+    # Orders
+    async def add_order(self, order: dict, items: List[dict]) -> None:
+        self.orders.add(order, items)
+
+    async def get_order(self, order_id: UUID) -> Optional[dict]:
+        return self.orders.get(order_id)
+
+    async def list_orders(self, **filters) -> Tuple[List[dict], int]:
+        return self.orders.query(**filters)
+
+    async def set_order_status(self, order_id: UUID, status) -> bool:
+        return self.orders.set_status(order_id, status)
+
+    async def order_stats(self) -> dict:
+        return self.orders.stats()
+
+    async def archive_orders(self, cutoff: datetime, segment_size: int) -> int:
+        """
+        Move paid orders created before `cutoff` into compressed segments.
+        Paid is a final status, so the records cannot change while a segment
+        is being encoded off the loop.
+        """
+        records = self.orders.archivable(cutoff)
+        for start in range(0, len(records), segment_size):
+            segment = records[start:start + segment_size]
+            blob = await self._run(encode_segment, segment)
+            self.orders.install_segment([order["id"] for order, _ in segment], blob)
+        return len(records)
+
+    # Payments
+    async def add_payment(self, payment: dict) -> None:
+        payments_db[payment["id"]] = payment
+
+    async def get_payment(self, payment_id: UUID) -> Optional[dict]:
+        return payments_db.get(payment_id)
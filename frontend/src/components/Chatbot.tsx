@@ -75,13 +75,16 @@ export default function Chatbot() {
 
             let assistantMessage = '';
             let currentToolMessages: Message[] = [];
+            // Coalesced frames can span reads; keep the trailing partial line
+            let pending = '';
 
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
 
-                const chunk = decoder.decode(value);
-                const lines = chunk.split('\n');
+                pending += decoder.decode(value, { stream: true });
+                const lines = pending.split('\n');
+                pending = lines.pop() ?? '';
 
                 for (const line of lines) {
                     if (line.startsWith('data: ')) {
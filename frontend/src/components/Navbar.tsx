@@ -3,8 +3,9 @@
 import Link from "next/link";
 import { ShoppingCart, Search, MapPin } from "lucide-react";
 import { useRouter } from "next/navigation";
-import { useEffect, useState } from "react";
-import { getCart, getCategories } from "@/lib/api";
+import { useEffect, useRef, useState } from "react";
+import { getCart, getCategories, subscribeToChanges, ChangeEvent } from "@/lib/api";
+import { CartItemRead } from "@/types";
 
 export default function Navbar() {
     const [cartCount, setCartCount] = useState(0);
@@ -13,12 +14,44 @@ export default function Navbar() {
     const [categories, setCategories] = useState<string[]>([]);
     const [selectedCategory, setSelectedCategory] = useState("All");
     const router = useRouter();
+    // Quantity per cart item id, so change-feed deltas can be applied without a refetch
+    const cartItems = useRef(new Map<string, number>());
+
+    const setCart = (cart: CartItemRead[]) => {
+        cartItems.current = new Map(cart.map(item => [item.id, item.quantity]));
+        updateCartCount();
+    };
+
+    const updateCartCount = () => {
+        let total = 0;
+        cartItems.current.forEach(quantity => { total += quantity; });
+        setCartCount(total);
+    };
+
+    const applyCartChange = (event: ChangeEvent) => {
+        const id = String(event.id);
+        switch (event.type) {
+            case "cart.added":
+            case "cart.updated":
+                cartItems.current.set(id, Number(event.quantity));
+                break;
+            case "cart.removed":
+                cartItems.current.delete(id);
+                break;
+            case "reset":
+                // Missed events (backend restart or fell too far behind): start over from the server
+                getCart().then(setCart);
+                return;
+            default:
+                return;
+        }
+        updateCartCount();
+    };
 
     const fetchInitialData = async () => {
         try {
             const [cart, cats] = await Promise.all([getCart(), getCategories()]);
-            const total = cart.reduce((acc, item) => acc + item.quantity, 0);
-            setCartCount(total);
+            setCart(cart);
             setCategories(cats);
         } catch (err) {
             console.error("Failed to fetch initial data:", err);
@@ -36,13 +69,15 @@ export default function Navbar() {
     useEffect(() => {
         fetchInitialData();
         const handleCartUpdate = () => {
-            getCart().then(cart => {
-                const total = cart.reduce((acc, item) => acc + item.quantity, 0);
-                setCartCount(total);
-            });
+            getCart().then(setCart);
         };
         window.addEventListener('cart-updated', handleCartUpdate);
-        return () => window.removeEventListener('cart-updated', handleCartUpdate);
+        // Cart changes made elsewhere (e.g. by the agent) arrive on the change feed as deltas
+        const unsubscribe = subscribeToChanges(["cart"], applyCartChange);
+        return () => {
+            window.removeEventListener('cart-updated', handleCartUpdate);
+            unsubscribe();
+        };
     }, []);
 
     return (
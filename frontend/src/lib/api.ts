@@ -1,4 +1,4 @@
-import { ProductRead, CartItemRead, OrderRead, CartItemCreate, OrderCreate, PaymentCreateIntent, PaymentConfirm, PaymentIntent } from "../types";
+import { ProductRead, SearchResults, CartItemRead, OrderRead, CartItemCreate, OrderCreate, PaymentCreateIntent, PaymentConfirm, PaymentIntent } from "../types";
 
 const BASE_URL = "http://127.0.0.1:8000";
 
@@ -20,6 +20,13 @@ export const searchProducts = (q?: string, category?: string) => {
     if (category && category !== "All") url += `category=${encodeURIComponent(category)}`;
     return fetcher<ProductRead[]>(url);
 };
+// Results plus category / price / rating counts in one request
+export const searchProductsWithFacets = (q?: string, category?: string) => {
+    let url = `/products/search?facets=true&`;
+    if (q) url += `q=${encodeURIComponent(q)}&`;
+    if (category && category !== "All") url += `category=${encodeURIComponent(category)}`;
+    return fetcher<SearchResults>(url);
+};
 export const getCategories = () => fetcher<string[]>("/products/categories");
 
 // Cart
@@ -41,3 +48,11 @@ export const createPaymentIntent = (data: PaymentCreateIntent) =>
     fetcher<PaymentIntent>(`/payments/create-intent`, { method: "POST", body: JSON.stringify(data) });
 export const confirmPayment = (data: PaymentConfirm) =>
     fetcher(`/payments/confirm`, { method: "POST", body: JSON.stringify(data) });
+
+// Change feed: one push stream instead of polling; EventSource resumes via Last-Event-ID
+export type ChangeEvent = { type: string; id?: string; [key: string]: unknown };
+export const subscribeToChanges = (topics: string[], onEvent: (event: ChangeEvent) => void) => {
+    const source = new EventSource(`${BASE_URL}/events?topics=${encodeURIComponent(topics.join(","))}`);
+    source.onmessage = (e) => onEvent(JSON.parse(e.data));
+    return () => source.close();
+};
@@ -10,6 +10,24 @@ export interface ProductRead {
     review_count: number;
 }
 
+export interface RangeCount {
+    min: number;
+    max: number | null;
+    count: number;
+}
+
+export interface SearchFacets {
+    categories: Record<string, number>;
+    price: RangeCount[];
+    rating: RangeCount[];
+}
+
+export interface SearchResults {
+    results: ProductRead[];
+    total: number;
+    facets: SearchFacets;
+}
+
 export interface CartItemRead {
     id: string;
     product: ProductRead;
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import socket
+import random
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(__file__), "..", "backend")
+MODES = ["threadpool", "async"]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    # A real server, so requests queue on the socket and in the loop like they do in production
+    # (an in-process ASGI transport runs non-suspending handlers inline and hides that wait)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND,
+        env={**os.environ, "BACKEND_HANDLERS": mode},
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/products/categories", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"server ({mode}) did not start")
+
+async def run(base_url: str, concurrency: int, requests: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        product_ids = [p["id"] for p in (await client.get("/products")).json()[:200]]
+        rng = random.Random(7)
+        latencies = []
+
+        async def timed(method, url, **kwargs):
+            t0 = time.perf_counter()
+            resp = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - t0)
+            return resp
+
+        # Small cart and product operations, the traffic the agent and storefront generate most
+        async def one_flow():
+            pid = rng.choice(product_ids)
+            await timed("GET", f"/products/{pid}")
+            item = (await timed("POST", "/cart", json={"product_id": pid, "quantity": 1})).json()
+            await timed("PUT", f"/cart/{item['id']}", params={"quantity": 2})
+            await timed("DELETE", f"/cart/{item['id']}")
+
+        remaining = requests // 4
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await one_flow()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    n = len(latencies)
+    p = lambda q: latencies[min(int(n * q), n - 1)] * 1000
+    return n / elapsed, p(0.50), p(0.99)
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and tail latency: threadpool vs async handlers")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--requests", type=int, default=8000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    # The client shares the machine with the server; absolute numbers are a floor
+    print(f"CPUs: {os.cpu_count()}  requests per run: {args.requests}")
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, port)
+        try:
+            for concurrency in args.concurrency:
+                rps, p50, p99 = asyncio.run(run(f"http://127.0.0.1:{port}", concurrency, args.requests))
+                print(f"{mode:>10}  concurrency={concurrency:>5}  "
+                      f"{rps:9.0f} req/s  p50={p50:7.2f}ms  p99={p99:7.2f}ms", flush=True)
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
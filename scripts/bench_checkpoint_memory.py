@@ -0,0 +1,107 @@
+import os
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+import importlib.util
+
+from langchain.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.memory import MemorySaver
+
+AGENT_DIR = os.path.join(os.path.dirname(__file__), "..", "backend", "shopping-agent", "agent")
+
+def load(name: str):
+    # Loaded by path: importing the `agent` package would build the real model client
+    spec = importlib.util.spec_from_file_location(name, os.path.join(AGENT_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+MessagesState = load("state").MessagesState
+CompactSerializer = load("checkpoint").CompactSerializer
+
+QUERIES = ["headphones", "laptop", "yoga mat", "coffee maker", "novel", "serum", "bicycle", "camera"]
+ADJECTIVES = ["Pro", "Ultra", "Smart", "Mini", "Classic", "Premium", "Elite", "Basic", "Advanced", "Legendary"]
+
+def listing(query: str) -> str:
+    """
+    What search_products returns for a query: the same text for every thread that asks.
+    """
+    rng = random.Random(query)
+    return "\n".join(
+        f"- {rng.choice(ADJECTIVES)} {query.title()} {rng.randint(100, 999)} (ID: {rng.getrandbits(128):032x}) | "
+        f"Price: ${rng.randint(500, 150000) / 100:.2f} | Category: Electronics | "
+        f"Image: https://loremflickr.com/600/600/{query.replace(' ', '')}"
+        for _ in range(20)
+    )
+
+def build_graph(checkpointer):
+    # Same shape as the agent graph (llm_call <-> tool_node), with scripted replies
+    def llm_call(state):
+        last = state["messages"][-1]
+        if isinstance(last, HumanMessage):
+            query = last.content.removeprefix("find ")
+            call = {"name": "search_products", "args": {"q": query}, "id": f"call_{random.getrandbits(48):x}"}
+            return {"messages": [AIMessage(content="", tool_calls=[call])]}
+        return {"messages": [AIMessage(content="Here are the best matches I found, sorted by rating.")]}
+
+    def tool_node(state):
+        call = state["messages"][-1].tool_calls[0]
+        return {"messages": [ToolMessage(content=listing(call["args"]["q"]), tool_call_id=call["id"])]}
+
+    def should_continue(state):
+        return "tool_node" if state["messages"][-1].tool_calls else END
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("llm_call", llm_call)
+    builder.add_node("tool_node", tool_node)
+    builder.add_edge(START, "llm_call")
+    builder.add_conditional_edges("llm_call", should_continue, {"tool_node": "tool_node", END: END})
+    builder.add_edge("tool_node", "llm_call")
+    return builder.compile(checkpointer=checkpointer)
+
+def run(label: str, serde, threads: int, turns: int):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    saver = MemorySaver(serde=serde)
+    graph = build_graph(saver)
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"thread-{t}"}}
+        for _ in range(turns):
+            graph.invoke({"messages": [HumanMessage(content=f"find {rng.choice(QUERIES)}")]}, config)
+    elapsed = time.perf_counter() - start
+
+    # Reading the state back decodes the latest checkpoint
+    t0 = time.perf_counter()
+    for t in range(threads):
+        graph.get_state({"configurable": {"thread_id": f"thread-{t}"}})
+    load_ms = (time.perf_counter() - t0) / threads * 1000
+
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del graph, saver
+
+    print(f"{label:>8}: {retained / threads / 1024:9.1f} KiB/thread  "
+          f"{elapsed / (threads * turns) * 1000:7.2f} ms/turn  {load_ms:6.2f} ms/state read")
+    return retained
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint memory per thread: default vs compact serializer")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.turns} turns (each turn: human, tool call, search listing, answer)")
+    before = run("default", None, args.threads, args.turns)
+    after = run("compact", CompactSerializer(), args.threads, args.turns)
+    print(f"memory reduction: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+from events import EventBus
+
+async def run(subscribers: int, events: int, publish_interval: float):
+    bus = EventBus(history=events + 1)
+    latencies = []
+
+    async def subscriber():
+        received = 0
+        async for offset, topic, payload in bus.subscribe(since=0):
+            latencies.append(time.perf_counter() - json.loads(payload)["sent_at"])
+            received += 1
+            if received == events:
+                return
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    # Let every subscriber reach its first wait before publishing
+    await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    for i in range(events):
+        bus.publish("cart", "cart.updated", {"id": i, "quantity": 1, "sent_at": time.perf_counter()})
+        await asyncio.sleep(publish_interval)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    delivered = len(latencies)
+    p = lambda q: latencies[min(int(delivered * q), delivered - 1)] * 1000
+    print(
+        f"subscribers={subscribers:>6} events={events:>5} delivered={delivered:>9} "
+        f"deliveries/s={delivered / elapsed:>12,.0f} p50={p(0.50):8.2f}ms p99={p(0.99):8.2f}ms max={latencies[-1] * 1000:8.2f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-out benchmark for the backend change feed")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between publishes")
+    args = parser.parse_args()
+
+    for n in args.subscribers:
+        asyncio.run(run(n, args.events, args.interval))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import random
+import argparse
+from uuid import uuid4
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+from search import Catalog
+from shards import ShardedCatalog
+
+CATEGORIES = ["Electronics", "Home & Kitchen", "Books", "Clothing", "Sports", "Beauty", "Automotive"]
+ADJECTIVES = ["Pro", "Ultra", "Smart", "Mini", "Classic", "Premium", "Elite", "Basic", "Advanced", "Legendary"]
+BASES = ["Phone", "Laptop", "Headphones", "Monitor", "Kettle", "Blender", "Novel", "Jacket", "Serum", "Bicycle",
+         "Treadmill", "Scarf", "Lamp", "Camera", "Speaker", "Shampoo", "Wiper Blades", "Yoga Mat", "Cookbook", "Toaster"]
+QUERIES = [
+    {"q": "headphones", "limit": 20},
+    {"q": "hedphones", "limit": 20},
+    {"q": "pro laptop", "sort": "price_asc", "limit": 20},
+    {"category": "Books", "min_price": 2000, "max_price": 30000, "limit": 20},
+    {"q": "smart", "facets": True, "limit": 20},
+    {"min_price": 50000, "sort": "price_desc", "limit": 20},
+]
+
+def make_products(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    products = []
+    for i in range(n):
+        adj, base = rng.choice(ADJECTIVES), rng.choice(BASES)
+        category = rng.choice(CATEGORIES)
+        name = f"{adj} {base} {rng.randint(100, 99999)}"
+        products.append({
+            "id": uuid4(),
+            "name": name,
+            "description": f"Experience the ultimate {base.lower()} with the {name}. This {category.lower()} essential features {adj.lower()} technology.",
+            "price": rng.randint(500, 150000),
+            "stock_quantity": rng.randint(0, 100),
+            "category": category,
+            "image_url": "https://example.com/p.jpg",
+            "is_active": True,
+            "created_at": start + timedelta(seconds=i),
+            "rating": round(rng.uniform(3.5, 5.0), 1),
+            "review_count": rng.randint(10, 5000),
+        })
+    return products
+
+def measure(catalog, requests: int, concurrency: int):
+    latencies = []
+
+    def one(i):
+        t0 = time.perf_counter()
+        catalog.search(**QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - t0)
+
+    # Warm up (first searches build pickling caches, page in the worker)
+    for i in range(len(QUERIES)):
+        catalog.search(**QUERIES[i])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Search throughput: in-process catalog vs N shard processes")
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    # Shards only scale up to the number of cores
+    print(f"CPUs: {os.cpu_count()}  concurrency: {args.concurrency}")
+    print(f"Building {args.products:,} products...")
+    products = make_products(args.products)
+
+    t0 = time.perf_counter()
+    local = Catalog({p["id"]: p for p in products})
+    print(f"in-process index built in {time.perf_counter() - t0:.1f}s")
+    qps, p50, p99 = measure(local, args.requests, args.concurrency)
+    print(f"{'in-process':>12}: {qps:8.1f} req/s  p50={p50:8.2f}ms  p99={p99:8.2f}ms")
+
+    for n in args.shards:
+        t0 = time.perf_counter()
+        sharded = ShardedCatalog(n, products)
+        built = time.perf_counter() - t0
+        try:
+            qps, p50, p99 = measure(sharded, args.requests, args.concurrency)
+        finally:
+            sharded.close()
+        print(f"{f'{n} shards':>12}: {qps:8.1f} req/s  p50={p50:8.2f}ms  p99={p99:8.2f}ms  (load {built:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+from uuid import uuid4
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+from search import Catalog, stem
+
+# Singular and plural must share a stem, or a query for one misses the other
+PLURAL_PAIRS = [
+    ("earring", "earrings"), ("string", "strings"), ("cookie", "cookies"), ("movie", "movies"),
+    ("battery", "batteries"), ("headphone", "headphones"), ("glass", "glasses"), ("box", "boxes"),
+    ("speed", "speeds"), ("tie", "ties"), ("key", "keys"), ("jersey", "jerseys"),
+]
+# Suffix stripping must not cut words down to fragments that appear inside unrelated ones
+MIN_STEMS = ["speed", "string", "seed", "thing", "bed", "red"]
+
+NAMES = ["Gold Earrings", "Guitar Strings", "Chocolate Chip Cookies", "Classic Movies Box Set", "AA Batteries",
+         "Wireless Headphones", "Speed Rope", "Silk Tie", "Special Edition Novel", "Straw Hat"]
+# query -> name of the product it must find (and, for typos, still find)
+QUERIES = {
+    "earring": "Gold Earrings", "string": "Guitar Strings", "cookie": "Chocolate Chip Cookies",
+    "movie": "Classic Movies Box Set", "battery": "AA Batteries", "headphone": "Wireless Headphones",
+    "ties": "Silk Tie", "earings": "Gold Earrings", "headphnes": "Wireless Headphones", "cookeis": "Chocolate Chip Cookies",
+}
+# query -> name of a product it must not find
+MISSES = {"speed": "Special Edition Novel", "string": "Straw Hat", "strings": "Straw Hat"}
+
+def make_catalog() -> Catalog:
+    products = {}
+    for name in NAMES:
+        product_id = uuid4()
+        products[product_id] = {
+            "id": product_id, "name": name, "description": f"{name} for everyday use.", "price": 1000,
+            "stock_quantity": 10, "category": "Misc", "image_url": "https://example.com/p.jpg", "is_active": True,
+            "created_at": datetime(2024, 1, 1), "rating": 4.5, "review_count": 10,
+        }
+    return Catalog(products)
+
+def test_stemming():
+    failures = 0
+    for singular, plural in PLURAL_PAIRS:
+        if stem(singular) != stem(plural):
+            print(f"FAIL stem({singular!r}) = {stem(singular)!r} but stem({plural!r}) = {stem(plural)!r}")
+            failures += 1
+    for word in MIN_STEMS:
+        if len(stem(word)) < min(len(word), 4):
+            print(f"FAIL stem({word!r}) = {stem(word)!r} is too short")
+            failures += 1
+
+    catalog = make_catalog()
+    for query, expected in QUERIES.items():
+        names = [p["name"] for p in catalog.search(q=query)[0]]
+        if expected not in names:
+            print(f"FAIL {query!r} did not find {expected!r} (got {names})")
+            failures += 1
+    for query, unexpected in MISSES.items():
+        names = [p["name"] for p in catalog.search(q=query)[0]]
+        if unexpected in names:
+            print(f"FAIL {query!r} found {unexpected!r}")
+            failures += 1
+
+    checks = len(PLURAL_PAIRS) + len(MIN_STEMS) + len(QUERIES) + len(MISSES)
+    print(f"{checks - failures}/{checks} checks passed")
+    assert failures == 0, f"{failures} stemming checks failed"
+
+if __name__ == "__main__":
+    try:
+        test_stemming()
+    except AssertionError:
+        sys.exit(1)